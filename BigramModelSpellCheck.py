@@ -5,200 +5,479 @@ Created on Thu Nov 26 18:47:02 2015
 @author: nausheenfatma
 """
 
-from indic_tokenizer import tokenizer
+import math
+import time
+import heapq
+
+from indic_tokenizer import get_tokenizer
+from ngram_store import Vocabulary, BigramStore, count_stream, merge_counts
+from parallel_build import count_parallel
+from model_file import write_model, open_model
+from candidate_index import CandidateIndex
+from edit_rules import get_edit_rules
+from smoothing import AddK
+from lru_cache import LRUCache
+from vector_scoring import NUMPY, VectorScorer
+
+SENTENCE_SEPARATOR="$$$"
+CHUNK_SIZE=1<<20		#bytes read at a time while building the model
+VECTOR_MIN_CANDIDATES=32	#candidate sets at least this large are scored with numpy,if installed
 
 class BigramModelSpellCheck:
-	def __init__(self):
+	def __init__(self,smoothing=None,lang="hin",cache_size=100000,cache_ttl=None,metrics=None):
 		self.raw_file="corpus_tokenised.txt" # "test_tokenised"   file containing tokenised words,sentence seperator='$$$'
-		self.bigrams={}
-		self.unigrams={}
+		self.unigrams=Vocabulary()		#word <-> integer id, with unigram counts
+		self.bigrams=BigramStore(self.unigrams)	#bigram counts by word ids
+		self.separator_id=self.unigrams.add(SENTENCE_SEPARATOR,0)
+		self.candidate_index=None		#deletion index over the vocabulary,see candidate_index.py,built on first use
+		self.index_candidates=True		#False to generate candidates with edits2 instead
+		self.smoothing=smoothing or AddK(1)	#AddK,KneserNey or StupidBackoff from smoothing.py
+		self.tokenizer=get_tokenizer(lang)	#shared per process,with its NBP table and dictionary
+		self.edit_rules=get_edit_rules(lang)	#replaceable and soft characters of the script,see edit_rules.py
+		self.candidate_cache=LRUCache(cache_size,cache_ttl)	#word -> candidate words
+		self.ranking_cache=LRUCache(cache_size,cache_ttl)	#(word,left id,right id) -> ranked candidates
+		self.metrics=metrics			#instrumentation.Metrics to time the stages,None for no overhead
+		self.vector_scorer=None			#numpy view of the counts,see vector_scoring.py,built on first use
   
   
-	def make_unigrams(self):
-		f=open(self.raw_file,"r")
-		for line in f:
-			line=line.rstrip()
-			if line in self.unigrams:
-				self.unigrams[line]=self.unigrams[line]+1				
-			else :
-				self.unigrams[line]=1
+	def build_model(self,source=None,pruning=None):
+		"""
+		Counts unigrams and bigrams together in a single streaming pass.
+		source can be an open file, or any iterable of text chunks such as
+		tokenizer.tokenize_stream(), so no intermediate file is needed.
+		Defaults to self.raw_file. pruning, a pruning.Pruning, bounds the
+		memory of the counts. Returns (no_of_tokens, seconds).
+		"""
+		if source is None:
+			with open(self.raw_file,"rb") as f:
+				return self.build_model(f,pruning)
+		start=time.time()
+		no_of_tokens=count_stream(self.unigrams,self.bigrams,self._chunks(source),SENTENCE_SEPARATOR,pruning)
+		if pruning is not None:
+			self.unigrams,self.bigrams=pruning.prune(self.unigrams,self.bigrams,keep=(SENTENCE_SEPARATOR,))
+		self.prepare_model()
+		seconds=time.time()-start
+		if self.metrics is not None:
+			self.metrics.add_time("build",seconds)
+			self.metrics.count("tokens_counted",no_of_tokens)
+		return no_of_tokens,seconds
+
+	def _chunks(self,source):	#text chunks of an open file,or source itself when already an iterable of chunks
+		if hasattr(source,"read"):
+			return iter(lambda read=source.read: read(CHUNK_SIZE),"")
+		return source
+
+	def update_model(self,source,remove=False):
+		"""
+		Adds tokenised text (a file or chunks,as for build_model) to the
+		model,or takes it out again with remove=True. Only the new text is
+		counted; the candidate index gains or loses just the words that
+		appear or disappear, and the smoothing tables are recomputed from
+		the counts. A mapped model file is first copied to memory. Removing
+		text the model was not built on raises ValueError and leaves the
+		counts as they were.
+		"""
+		self._counts_in_memory()
+		delta=Vocabulary()
+		delta_bigrams=BigramStore(delta)
+		no_of_tokens=count_stream(delta,delta_bigrams,self._chunks(source),SENTENCE_SEPARATOR)
+		counts_before=[self.unigrams.count(self.unigrams.index(word)) for word in delta]
+		merge_counts(self.unigrams,self.bigrams,delta,delta_bigrams,-1 if remove else 1)
+		if self.candidate_index is not None:
+			for word,count_before in zip(delta,counts_before):	#words that appear,or come back after a removal,and words that disappear
+				i=self.unigrams.index(word)
+				count=self.unigrams.count(i)
+				if i == self.separator_id:
+					continue
+				if count_before <= 0 < count:
+					self.candidate_index.add(i)
+				elif count <= 0 < count_before:
+					self.candidate_index.remove(i)
+		self.separator_id=self.unigrams.index(SENTENCE_SEPARATOR)
+		self.smoothing.prepare(self.unigrams,self.bigrams)
+		self.clear_caches()
+		return no_of_tokens
+
+	def build_model_parallel(self,processes=None,filename=None):
+		"""
+		Like build_model over a file, but the file is split at "$$$" lines
+		into shards counted by a pool of processes, see parallel_build.py.
+		"""
+		start=time.time()
+		no_of_tokens=count_parallel(self.unigrams,self.bigrams,filename or self.raw_file,SENTENCE_SEPARATOR,processes,CHUNK_SIZE)
+		self.prepare_model()
+		seconds=time.time()-start
+		if self.metrics is not None:
+			self.metrics.add_time("build",seconds)
+			self.metrics.count("tokens_counted",no_of_tokens)
+		return no_of_tokens,seconds
+
+	def merge_model(self,other):	#adds the counts of another BigramModelSpellCheck,eg. one built on another day
+		self._counts_in_memory()
+		merge_counts(self.unigrams,self.bigrams,other.unigrams,other.bigrams)
+		self.prepare_model()
+
+	def _counts_in_memory(self):	#a mapped model file is read-only,its counts are copied to memory before they change
+		if not isinstance(self.unigrams,Vocabulary):
+			unigrams=Vocabulary()
+			bigrams=BigramStore(unigrams)
+			merge_counts(unigrams,bigrams,self.unigrams,self.bigrams)	#copied in id order,so ids are kept
+			bigrams.sketch=self.bigrams.sketch
+			self.unigrams,self.bigrams=unigrams,bigrams
+			if self.candidate_index is not None:
+				self.candidate_index.vocab=unigrams
+
+	def prepare_model(self,index_candidates=True):	#rebuilds everything derived from the counts,the candidate index when first used
+		self.bigrams.freeze()
+		self.separator_id=self.unigrams.index(SENTENCE_SEPARATOR)
+		self.candidate_index=None
+		self.index_candidates=index_candidates
+		self.smoothing.prepare(self.unigrams,self.bigrams)
+		self.clear_caches()
 
+	def build_candidate_index(self):	#the candidate index,built now if it is not yet;None with index_candidates=False
+		if self.candidate_index is None and self.index_candidates:
+			if self.metrics is not None:
+				start=time.time()
+			self.candidate_index=CandidateIndex(self.unigrams,rules=self.edit_rules)
+			if self.metrics is not None:
+				self.metrics.since("index",start)
+		return self.candidate_index
+
+	#make_unigrams/make_bigrams used to scan the corpus once each,both tables now come from build_model
+	def make_unigrams(self):
+		if not self.unigrams.total:
+			self.build_model()
 
 	def make_bigrams(self):
-		f=open(self.raw_file,"r")
-		k_minus_1_word="$$$"
-		while True:	
-			line=f.readline()
-			if not line: break 
-			line=line.rstrip()
-			k_word=line
-			bigram=k_minus_1_word+"_"+k_word
-			if not line=="$$$":
-				if bigram in self.bigrams:
-					self.bigrams[bigram]=self.bigrams[bigram]+1 #increase count by 1
-				else :
-					self.bigrams[bigram]=1	#initialise count=1
-
-			k_minus_1_word=line;			#for next bigram,update k-1
+		if not self.unigrams.total:
+			self.build_model()
 
 	def save_grams(self,filename,gram_dict):
-		f=open(filename,"w")
-		for gram in gram_dict:
-			f.write(gram+"\t"+str(gram_dict[gram]))
-			#f.write("")
-			f.write("\n")
-
-	def find_bigram_likelihood(self,a_comma_b):
-		no_a_and_b=self.bigrams[a_comma_b]
-		b=a_comma_b.split("_")[1]
-		no_b=self.unigrams[b]
-		bigram_prob=no_a_and_b/float(no_b)
-		print bigram_prob
-
-	def sentence_tokenizer(self,line):
-		tzr = tokenizer()
-		line = line.decode('utf-8')
-		line = tzr.normalize(line)
-		line = tzr.tokenize(line)
+		with open(filename,"w") as f:
+			for gram,count in gram_dict.iteritems():
+				f.write(gram+"\t"+str(count)+"\n")
+
+	def save_model(self,filename):		#binary model file, see model_file.py
+		write_model(filename,self.unigrams,self.bigrams)
+
+	def load_model(self,filename,index_candidates=True):	#maps a model file written by save_model,nothing is parsed
+		self.unigrams,self.bigrams=open_model(filename)
+		self.prepare_model(index_candidates)
+
+	def clear_caches(self):		#cached results are only valid for the model they came from
+		self.candidate_cache.clear()
+		self.ranking_cache.clear()
+		self.vector_scorer=None
+
+	def stats(self):	#timers and counters of self.metrics (if any) with the cache statistics,as a plain dict
+		stats=self.metrics.snapshot() if self.metrics is not None else {}
+		stats["caches"]={"candidates":self.candidate_cache.stats(),"rankings":self.ranking_cache.stats()}
+		return stats
+
+	def find_bigram_likelihood(self,a,b):	#P(b|a), unsmoothed
+		a_id=self.unigrams.index(a)
+		no_a=self.unigrams.count(a_id)
+		if not no_a:
+			return 0.0
+		return self.bigrams.count(a_id,self.unigrams.index(b))/float(no_a)
+
+	def sentence_tokenizer(self,line):	#tokens joined by \n
+		if self.metrics is not None:
+			start=time.time()
+		if isinstance(line,str):
+			line = line.decode('utf-8')
+		line = self.tokenizer.normalize(line)
+		line = self.tokenizer.tokenize(line)
+		if self.metrics is not None:
+			self.metrics.since("tokenize",start)
 		return line
 
+	def sentence_tokens(self,line):		#list of utf-8 tokens
+		if self.metrics is not None:
+			start=time.time()
+		if isinstance(line,str):
+			line = line.decode('utf-8')
+		line = self.tokenizer.normalize(line)
+		tokens=[token.encode("utf-8") for token in self.tokenizer.tokenize_iter(line)]
+		if self.metrics is not None:
+			self.metrics.since("tokenize",start)
+		return tokens
+
 
 	def sentence_likelihood(self,line): #line here represent string with \n as separator
-        #finding tokens/unigrams
-	    #line=self.sentence_tokenizer(line)
-	    #finding bigrams below   
-	    tokens = line.split("\n")
-	    prev_token=tokens[0].encode("utf-8")
-	    bigrams=[]
-	    sentence_likelihood=1
-	    for index in range(1,len(tokens)):
-	    	next_token=tokens[index].encode('utf-8')
-	    	bigram=prev_token+"_"+next_token
-	    	bigrams.append(bigram)
-	    	print bigram
-	    	prev_token=next_token
-        #finding bigram likelihood of the sentence
-		
-	    for bigram in bigrams:
-	    	n_bigram=0
-	    	if bigram in self.bigrams:
-				n_bigram=self.bigrams[bigram]
-			#print n_bigram
-	    	first_word=bigram.split("_")[0]
-	    	n_first_word=0
-	    	if n_first_word in self.unigrams:
-				n_first_word=self.unigrams[first_word]
-	    	V=len(self.unigrams)
-	    	bigram_likelihood=(n_bigram+1)/float(n_first_word+V) #a simple add 1 smoothing
-	    	sentence_likelihood=sentence_likelihood*bigram_likelihood
-			
-	    print "sentence_likelihood",sentence_likelihood
-	    return sentence_likelihood
-
-
-	def create_edited_words(self,word): #for hindi
-	    CHARACTERS_TO_REPLACE=['ी','ि','ु','े','ै','ो','ौ','़','्','ं','ँ','आ','अ','ए','ऐ','ओ','औ','इ','ई' ,'ी','ा','ू']
-	    SOFT_VOWELS=['ि','ु','े','़','्','ं','ँ'] #observation is insertion and deletion edits can have only these characters
-
-		#splitting the word into all possible number of sequential parts 
-	    splits=[(word[:3*i], word[3*i:]) for i in range((len(word))/3 + 1)]		#hindi character has length=3
-	    
-		#deletes  of matra below
-	    deletes=[]
-
-	    for a,b in splits:
-	    	#print a,b
-	    	#print b[0:3]
-	    	#print b[3:]
-	    	if b[0:3] in SOFT_VOWELS:
-	    		edited_word=a+b[3:]
-	    		#print "edited",edited_word
-	    		deletes.append(edited_word)
-
-
-        # replace of matra below
-	    replaces=[]
-	    for a,b in splits:     
-        	if b[0:3] in CHARACTERS_TO_REPLACE:
-        		for character in CHARACTERS_TO_REPLACE:
-        			if character !=b[0:3]:
-        				edited_word=a+character+b[3:]
-        				replaces.append(edited_word)
-        				#print edited_word
-        # insert of matra below
-	    inserts=[]
- 	    for a,b in splits: 
- 	    	#print "here",a[-3:]
-        	if b[0:3] not in CHARACTERS_TO_REPLACE and a[-3:] not in  CHARACTERS_TO_REPLACE: 
-        		for character in SOFT_VOWELS:       		
-        			edited_word=a+character+b
-        			inserts.append(edited_word) 
- 	    edit_set=inserts+deletes+replaces+[word]
-           
- 	    return set(edit_set)
+		return math.exp(self.sentence_log_likelihood(line))	#underflows to 0.0 on long sentences
+
+	def sentence_log_likelihood(self,line): #natural log,line as for sentence_likelihood
+		#finding tokens/unigrams
+		#line=self.sentence_tokenizer(line)
+		if self.metrics is not None:
+			start=time.time()
+		index=self.unigrams.index
+		ids=[index(token.encode("utf-8")) for token in line.split("\n")]
+		log_likelihood=self.ids_log_likelihood(ids)
+		if self.metrics is not None:
+			self.metrics.since("score",start)
+			self.metrics.count("sentences_scored")
+		return log_likelihood
+
+	def batch_log_likelihood(self,sentences):
+		"""
+		Log likelihoods of raw sentences,as ids_log_likelihood of their
+		tokens. With numpy the bigrams of the whole batch are scored in one
+		vectorized pass.
+		"""
+		index=self.unigrams.index
+		batch=[[index(token) for token in self.sentence_tokens(sentence)] for sentence in sentences]
+		if not NUMPY:
+			return [self.ids_log_likelihood(ids) for ids in batch]
+		if self.metrics is not None:
+			start=time.time()
+		first=[]
+		second=[]
+		for ids in batch:
+			first.extend(ids[:-1])
+			second.extend(ids[1:])
+		log_probs=self.vectors().log_probs(first,second).tolist()
+		log_likelihoods=[]
+		at=0
+		for ids in batch:
+			log_likelihood=0.0
+			for log_prob in log_probs[at:at+len(ids)-1]:	#summed in order,as ids_log_likelihood does
+				log_likelihood+=log_prob
+			at+=max(len(ids)-1,0)
+			log_likelihoods.append(log_likelihood)
+		if self.metrics is not None:
+			self.metrics.since("score",start)
+			self.metrics.count("sentences_scored",len(batch))
+		return log_likelihoods
+
+	def vectors(self):	#VectorScorer of the current model,needs numpy
+		if self.vector_scorer is None:
+			self.vector_scorer=VectorScorer(self.bigrams,self.smoothing)
+		return self.vector_scorer
+
+	def ids_log_likelihood(self,ids,skip=()):	#log likelihood of a sentence given as word ids,-1 for unknown words
+		log_prob=self.smoothing.log_prob
+		log_likelihood=0.0
+		for index in range(1,len(ids)):
+			if index in skip: continue	#bigram ending at ids[index] left out
+			log_likelihood+=log_prob(ids[index-1],ids[index])
+		return log_likelihood
+
+
+	def create_edited_words(self,word):	#utf-8 words one edit away from word,by the edit rules of the model's script
+		return set(edited.encode("utf-8") for edited in self.edit_rules.edits1(word.decode("utf-8")))
 
 	def edits2(self,word):
-		return set(e2 for e1 in self.create_edited_words(word) for e2 in self.create_edited_words(e1))
+		return set(edited.encode("utf-8") for edited in self.edit_rules.edits2(word.decode("utf-8")))
 			
+	def candidate_words(self,word):	#in-vocabulary words within 2 edits of word,shared list not to be modified
+		candidate_words=self.candidate_cache.get(word)
+		if candidate_words is None:
+			candidate_index=self.build_candidate_index()
+			metrics=self.metrics
+			if metrics is not None:
+				start=time.time()
+			if candidate_index is None:
+				edit_set=self.edits2(word)
+				if metrics is not None:
+					metrics.since("candidates",start)
+					metrics.count("edits_generated",len(edit_set))
+				candidate_words=self.prune_out_of_vocab_words(edit_set)
+			else:
+				candidate_words=candidate_index.candidates(word)
+				if metrics is not None:
+					metrics.since("candidates",start)
+			if metrics is not None:
+				metrics.count("candidates_in_vocabulary",len(candidate_words))
+			self.candidate_cache.put(word,candidate_words)
+		return candidate_words
+
 	def prune_out_of_vocab_words(self,edit_set):
+		if self.metrics is not None:
+			start=time.time()
 		candidate_words=[]
 		for e1 in edit_set:
 			if e1 in self.unigrams:
 				candidate_words.append(e1)	
+		if self.metrics is not None:
+			self.metrics.since("prune",start)
 		return candidate_words
 
-	def find_max_edit_likelihood(self,sentence,word_offset):
-		sentence=self.sentence_tokenizer(sentence)
-		tokens=sentence.split("\n")
-		temp=tokens[:]
-		max_prob=self.sentence_likelihood(sentence)		#initialise max probability to the original word
-		if len(tokens) > word_offset :
-			word_to_edit=tokens[word_offset-1]
-			word_to_edit= word_to_edit.encode("utf-8")
-			print word_to_edit
-			candidate_words=self.prune_out_of_vocab_words(self.edits2(word_to_edit))
-			print len(candidate_words)
-   			word_with_max_prob=word_to_edit
-                
-			for word in candidate_words:
-				temp[word_offset-1]=word.decode("utf-8")
-				new_sentence="\n".join(temp)
-				prob=self.sentence_likelihood(new_sentence)
-				print "word="+word+"prob="+str(prob)
-				if max_prob < prob:
-					max_prob=prob
-					word_with_max_prob=word
-				#print new_sentence.encode("utf-8")
-			print "word with max prob"+word_with_max_prob+" has max prob of "+str(max_prob)
+	def find_max_edit_likelihood(self,sentence,word_offset,k=10):
+		"""
+		Ranks replacements for the word at word_offset (counted from 1) and
+		returns the top k as (word,sentence log likelihood), most probable first.
+		The original word is ranked along with its candidates. Only the two
+		bigrams touching word_offset change between candidates, so the rest
+		of the sentence is scored once, and the ranking by those two bigrams
+		is cached on (word,left neighbour,right neighbour).
+		"""
+		tokens=self.sentence_tokens(sentence)
+		if not 0 < word_offset <= len(tokens):
+			return []
+		index=self.unigrams.index
+		return self.rank_edits(tokens,[index(token) for token in tokens],word_offset-1,k)
+
+	def rank_edits(self,tokens,ids,at,k=10):	#find_max_edit_likelihood for the token at index at,on a sentence already tokenized and looked up
+		if self.metrics is not None:
+			start=time.time()
+		fixed=self.ids_log_likelihood(ids,skip=(at,at+1))
+		if self.metrics is not None:
+			self.metrics.since("score",start)
+		left=ids[at-1] if at > 0 else None
+		right=ids[at+1] if at+1 < len(ids) else None
+		word_to_edit=tokens[at]
+		key=(word_to_edit,left,right)
+		ranked=self.ranking_cache.get(key)
+		if ranked is None:
+			ranked=self.rank_candidates(word_to_edit,left,right)
+			self.ranking_cache.put(key,ranked)
+		return [(word,fixed+local) for local,word in ranked[:k]]
+
+	def rank_candidates(self,word_to_edit,left,right):	#[(log prob of the bigrams around the word,word)],best first
+		index=self.unigrams.index
+		log_prob=self.smoothing.log_prob
+		candidate_words=set(self.candidate_words(word_to_edit))
+		candidate_words.add(word_to_edit)
+		if self.metrics is not None:
+			start=time.time()
+			self.metrics.count("candidates_scored",len(candidate_words))
+		if NUMPY and len(candidate_words) >= VECTOR_MIN_CANDIDATES:
+			scored=self.rank_candidates_vectorized(candidate_words,left,right)
+			if self.metrics is not None:
+				self.metrics.since("score",start)
+			return scored
+		scored=[]
+		for word in candidate_words:
+			word_id=index(word)
+			local=0.0
+			if left is not None:
+				local+=log_prob(left,word_id)
+			if right is not None:
+				local+=log_prob(word_id,right)
+			scored.append((local,word))
+		scored.sort(reverse=True)
+		if self.metrics is not None:
+			self.metrics.since("score",start)
+		return scored
+
+	def rank_candidates_vectorized(self,candidate_words,left,right):	#as rank_candidates,all candidates in one numpy pass
+		index=self.unigrams.index
+		words=list(candidate_words)
+		ids=[index(word) for word in words]
+		vectors=self.vectors()
+		local=None
+		if left is not None:
+			local=vectors.log_probs([left]*len(ids),ids)
+		if right is not None:
+			right_log_probs=vectors.log_probs(ids,[right]*len(ids))
+			local=right_log_probs if local is None else local+right_log_probs
+		scored=zip(local.tolist() if local is not None else [0.0]*len(words),words)
+		scored.sort(reverse=True)
+		return scored
+
+	def correct_sentence(self,sentence,threshold=None,beam=8):	#corrected tokens (utf-8) of a raw sentence
+		return self.correct_tokens(self.sentence_tokens(sentence),threshold,beam)
+
+	def correct_document(self,text,threshold=None,beam=8):	#one list of corrected tokens per line of text
+		return [self.correct_sentence(line,threshold,beam) for line in text.splitlines()]
+
+	def is_suspect(self,ids,at,threshold=None):
+		"""
+		A word needs correcting when it is out of vocabulary or, given a log
+		probability threshold, when neither bigram around it reaches it.
+		"""
+		if ids[at] < 0:
+			return True
+		if threshold is None:
+			return False
+		log_prob=self.smoothing.log_prob
+		left=log_prob(ids[at-1] if at > 0 else self.separator_id,ids[at])
+		if left >= threshold:
+			return False
+		return at+1 == len(ids) or log_prob(ids[at],ids[at+1]) < threshold
+
+	def correct_tokens(self,tokens,threshold=None,beam=8):
+		"""
+		Jointly corrects all suspect words of a tokenised sentence. Each
+		suspect is replaced by a lattice column holding the word and its beam
+		most frequent candidates, and a Viterbi search over the bigram scores
+		picks the best path, in time linear in the sentence length.
+		"""
+		if not tokens:
+			return []
+		index=self.unigrams.index
+		count=self.unigrams.count
+		log_prob=self.smoothing.log_prob
+		ids=[index(token) for token in tokens]
+		lattice=[]
+		for at,token in enumerate(tokens):
+			states=[(token,ids[at])]
+			if self.is_suspect(ids,at,threshold):
+				candidates=[(word,index(word)) for word in self.candidate_words(token) if word != token]
+				states.extend(heapq.nlargest(beam,candidates,key=lambda candidate: count(candidate[1])))
+				if self.metrics is not None:
+					self.metrics.count("suspects")
+			lattice.append(states)
+
+		if self.metrics is not None:
+			start=time.time()
+		scores=[log_prob(self.separator_id,word_id) for word,word_id in lattice[0]]
+		back_pointers=[]
+		for at in range(1,len(lattice)):
+			prev_states=lattice[at-1]
+			new_scores=[]
+			pointers=[]
+			for word,word_id in lattice[at]:
+				best,best_j=max((scores[j]+log_prob(prev_id,word_id),j) for j,(prev_word,prev_id) in enumerate(prev_states))
+				new_scores.append(best)
+				pointers.append(best_j)
+			scores=new_scores
+			back_pointers.append(pointers)
+
+		j=max(range(len(scores)),key=scores.__getitem__)
+		corrected=[lattice[-1][j][0]]
+		for at in range(len(lattice)-1,0,-1):
+			j=back_pointers[at-1][j]
+			corrected.append(lattice[at-1][j][0])
+		corrected.reverse()
+		if self.metrics is not None:
+			self.metrics.since("score",start)
+		return corrected
 
 
 
 
 
 def main():
-	bm=BigramModelSpellCheck()
+	bm=BigramModelSpellCheck()	#add one smoothing,or eg. BigramModelSpellCheck(smoothing.KneserNey())
+					#BigramModelSpellCheck(metrics=instrumentation.Metrics()) times each stage,see bm.stats()
 	
 	################Builds the Bigram Language Model############################################
-	bm.make_bigrams()
+	no_of_tokens,seconds=bm.build_model()		#or straight from raw text: bm.build_model(bm.tokenizer.tokenize_stream(open("corpus.txt")))
+	print "built model from %d tokens in %.2fs (%.0f tokens/sec)" %(no_of_tokens,seconds,no_of_tokens/max(seconds,1e-9))
 	bm.save_grams("bigrams.txt",bm.bigrams)		#optional step,just for viewing the bigrams
-	bm.make_unigrams()
 	bm.save_grams("unigrams.txt",bm.unigrams)	#optional step,just for viewing the unigrams
+	bm.save_model("model.bglm")			#later runs can skip the build with bm.load_model("model.bglm")
 	
 	
 	################Test on an input sentence, given the index/position of the word in the sentence############################################
-	# bm.find_bigram_likelihood("तीन_फीसदी")
+	# print bm.find_bigram_likelihood("तीन","फीसदी")
  
 
 	#commented 3 lines of code below on how to find sentence likelihood
 	#line="हथियारों की तादाद के बारे में यकीन से कछ नहीं कहा जा सकता"
 	#line=bm.sentence_tokenizer(line)
-	#bm.sentence_likelihood(line)
+	#print bm.sentence_likelihood(line)
  
 	
 	#To find the maximum likelihood of a sentence by editing the word at the give the offset. 	
 	#bm.find_max_edit_likelihood("दो मोटर साइकिल स्वारों ने चालीस बर्स के डॉक्टर राशिद महदी को फायरिंग कर के हलाक कर दिया",4)
 	#bm.find_max_edit_likelihood("जो भी हल निकालआ जाए",4)
-	bm.find_max_edit_likelihood("ईश्वर्य राय और सलमान खान ने हिदायत कार संजय भंसाली की मशहूर फिल्म हम दल दे चुके सनम में साथ काम किया था",1) 
+	for word,prob in bm.find_max_edit_likelihood("ईश्वर्य राय और सलमान खान ने हिदायत कार संजय भंसाली की मशहूर फिल्म हम दल दे चुके सनम में साथ काम किया था",1):
+		print word,prob
  	#bm.find_max_edit_likelihood("चिनांचा सेंसर बोर्ड के अरकॉन जब शिकायत् सुनने के बाद पड़ताल कर लिए हॉल में पहुँचते",7)
 
 
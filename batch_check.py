@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Batch spell checking of many sentences over a process pool.
+
+The model is loaded once in the parent and inherited by the forked workers,
+so the mmapped model file, the candidate index and the model's tokenizer
+are shared rather than rebuilt per process. Results come back in input
+order as they are ready.
+"""
+
+import sys
+import time
+import argparse
+import multiprocessing
+from functools import partial
+from itertools import islice
+
+from BigramModelSpellCheck import BigramModelSpellCheck
+
+_model = None   # set before the pool forks, read by the workers
+
+
+def _correct(sentence, threshold, beam):
+    return ' '.join(_model.correct_sentence(sentence, threshold, beam))
+
+
+def check_batch(model, sentences, processes=None, chunksize=64, threshold=None, beam=8):
+    """
+    Yields the corrected text of each sentence (utf-8, tokens separated by
+    spaces) in input order. sentences may be any iterable, eg. an open file;
+    it is read in blocks so memory stays bounded on long inputs.
+    """
+    global _model
+    _model = model
+    model.build_candidate_index()   # once, before the workers fork
+    correct = partial(_correct, threshold=threshold, beam=beam)
+    if processes == 1:
+        for sentence in sentences:
+            yield correct(sentence)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        block = (processes or multiprocessing.cpu_count()) * chunksize * 4
+        sentences = iter(sentences)
+        while True:
+            batch = list(islice(sentences, block))
+            if not batch:
+                break
+            for corrected in pool.imap(correct, batch, chunksize):
+                yield corrected
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def scaling(model, sentences, max_processes, chunksize=64):
+    """Yields (processes, sentences/sec) for 1..max_processes workers."""
+    for processes in xrange(1, max_processes + 1):
+        start = time.time()
+        for _ in check_batch(model, sentences, processes, chunksize):
+            pass
+        yield processes, len(sentences) / max(time.time() - start, 1e-9)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="batch_check",
+                                     description="Corrects one sentence per line with a pool of workers")
+    parser.add_argument('--m', metavar='model', dest="MODEL", default="model.bglm", help="<model-file>")
+    parser.add_argument('--i', metavar='input', dest="INFILE", type=argparse.FileType('r'), default=sys.stdin, help="<input-file>")
+    parser.add_argument('--o', metavar='output', dest="OUTFILE", type=argparse.FileType('w'), default=sys.stdout, help="<output-file>")
+    parser.add_argument('--p', metavar='processes', dest="PROCESSES", type=int, default=multiprocessing.cpu_count(), help="number of worker processes")
+    parser.add_argument('--c', metavar='chunksize', dest="CHUNKSIZE", type=int, default=64, help="sentences handed to a worker at a time")
+    parser.add_argument('--scaling', action='store_true', help="report sentences/sec for 1..p workers instead of correcting")
+    args = parser.parse_args()
+
+    bm = BigramModelSpellCheck()
+    bm.load_model(args.MODEL)
+    if args.scaling:
+        sentences = args.INFILE.readlines()
+        for processes, rate in scaling(bm, sentences, args.PROCESSES, args.CHUNKSIZE):
+            args.OUTFILE.write('%d\t%.1f sentences/sec\n' % (processes, rate))
+    else:
+        for corrected in check_batch(bm, args.INFILE, args.PROCESSES, args.CHUNKSIZE):
+            args.OUTFILE.write('%s\n' % corrected)
+
+    args.INFILE.close()
+    args.OUTFILE.close()
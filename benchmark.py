@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Reproducible benchmarks of BigramModelSpellCheck on a synthetic Devanagari
+corpus: model build throughput, edits2 candidate counts and latency,
+sentence_likelihood and find_max_edit_likelihood latency percentiles,
+batch_log_likelihood throughput, tokenizer lines/sec and peak memory, that
+of the build measured in a fresh process. The corpus is generated from a
+seeded random Zipf distribution over made up words, so two runs with the
+same options measure the same work. Results are written as JSON; --compare
+prints the ratios against an earlier result file.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import bisect
+import platform
+import resource
+import argparse
+import tempfile
+import subprocess
+
+from BigramModelSpellCheck import BigramModelSpellCheck
+from vector_scoring import NUMPY
+
+CONSONANTS = u'कखगघचछजझटठडढतथदधनपफबभमयरलवशसह'
+VOWEL_SIGNS = [u'', u'ा', u'ि', u'ी', u'ु', u'ू', u'े', u'ै', u'ो', u'ौ', u'ं', u'्']
+PUNCTUATION = [u'।', u',', u'?']
+
+
+def synthetic_words(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(u''.join(rng.choice(CONSONANTS) + rng.choice(VOWEL_SIGNS) for _ in xrange(rng.randint(1, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def synthetic_sentences(seed=0, sentences=10000, vocab=5000, min_length=4, max_length=16):
+    """Yields (raw sentence, its words) with word frequencies following Zipf's law."""
+    rng = random.Random(seed)
+    words = synthetic_words(rng, vocab)
+    cumulative = []
+    total = 0.0
+    for rank in xrange(len(words)):
+        total += 1.0 / (rank + 1)
+        cumulative.append(total)
+    for _ in xrange(sentences):
+        sentence = [words[bisect.bisect(cumulative, rng.random() * total)]
+                    for _ in xrange(rng.randint(min_length, max_length))]
+        yield u' '.join(sentence) + u' ' + rng.choice(PUNCTUATION), sentence
+
+
+def write_corpus(directory, **options):
+    """Writes corpus.txt (raw, one sentence per line) and corpus_tokenised.txt; returns their paths."""
+    raw = os.path.join(directory, 'corpus.txt')
+    tokenised = os.path.join(directory, 'corpus_tokenised.txt')
+    with open(raw, 'wb') as raw_fp, open(tokenised, 'wb') as tokenised_fp:
+        for sentence, words in synthetic_sentences(**options):
+            raw_fp.write(sentence.encode('utf-8') + '\n')
+            tokenised_fp.write(u'\n'.join(words).encode('utf-8') + '\n$$$\n')
+    return raw, tokenised
+
+
+def peak_memory_kb():
+    """
+    High-water mark of the resident memory of this process in KB: VmHWM
+    where /proc has it, since ru_maxrss also keeps the peak of a parent
+    the process was forked and exec'ed from.
+    """
+    try:
+        with open('/proc/self/status') as fp:
+            for line in fp:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss    # KB on Linux
+
+
+def build_memory_kb(tokenised):
+    """
+    Peak memory of building a model from tokenised, measured in a fresh
+    process since a high-water mark never goes down: the peak after the
+    build, and its growth over the peak after the imports.
+    """
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--build-memory', tokenised])
+    return json.loads(output)
+
+
+def measure_build_memory(tokenised):     # run by build_memory_kb in the fresh process
+    before = peak_memory_kb()
+    bm = BigramModelSpellCheck()
+    bm.raw_file = tokenised
+    bm.make_unigrams()
+    bm.make_bigrams()
+    bm.build_candidate_index()
+    after = peak_memory_kb()
+    return {'peak_memory_kb': after, 'peak_memory_growth_kb': after - before}
+
+
+def latencies(func, args):
+    """Calls func(*a) for every a in args; returns the summary of the wall times in ms."""
+    times = []
+    for a in args:
+        start = time.time()
+        func(*a)
+        times.append((time.time() - start) * 1000.0)
+    return summary(times)
+
+
+def summary(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    percentile = lambda p: values[min(len(values) - 1, int(p / 100.0 * len(values)))]
+    return {'n': len(values),
+            'mean': float(sum(values)) / len(values),
+            'p50': percentile(50),
+            'p90': percentile(90),
+            'p99': percentile(99),
+            'max': values[-1]}
+
+
+def run(sentences=10000, vocab=5000, queries=200, seed=0, smoothing=None):
+    """Runs every benchmark and returns the results as a dict."""
+    results = {'options': {'sentences': sentences, 'vocab': vocab, 'queries': queries, 'seed': seed},
+               'python': platform.python_version(),
+               'numpy': NUMPY,
+               'platform': platform.platform()}
+    directory = tempfile.mkdtemp(prefix='bigram_benchmark')
+    try:
+        raw, tokenised = write_corpus(directory, seed=seed, sentences=sentences, vocab=vocab)
+
+        bm = BigramModelSpellCheck(smoothing)
+        bm.raw_file = tokenised
+        start = time.time()
+        bm.make_unigrams()
+        bm.make_bigrams()
+        bm.build_candidate_index()
+        seconds = time.time() - start
+        results['build'] = {'tokens': bm.unigrams.total,
+                            'words': len(bm.unigrams),
+                            'bigrams': len(bm.bigrams),
+                            'seconds': seconds,
+                            'tokens_per_sec': bm.unigrams.total / max(seconds, 1e-9)}
+        results['build'].update(build_memory_kb(tokenised))
+
+        rng = random.Random(seed + 1)
+        with open(raw, 'rb') as fp:
+            lines = [line.decode('utf-8') for line in fp]
+        sample = [lines[rng.randrange(len(lines))] for _ in xrange(queries)]
+
+        start = time.time()
+        for line in lines:
+            bm.tokenizer.tokenize(bm.tokenizer.normalize(line))
+        seconds = time.time() - start
+        results['tokenize'] = {'lines': len(lines), 'seconds': seconds, 'lines_per_sec': len(lines) / max(seconds, 1e-9)}
+
+        tokenised_sample = [bm.sentence_tokens(line) for line in sample]
+        words = [rng.choice(tokens) for tokens in tokenised_sample]
+        results['edits2'] = {'latency_ms': latencies(bm.edits2, [(word,) for word in words[:max(1, queries // 10)]]),
+                             'candidates': summary([len(bm.edits2(word)) for word in words[:max(1, queries // 10)]]),
+                             'in_vocabulary': summary([len(bm.candidate_words(word)) for word in words])}
+
+        joined = [u'\n'.join(token.decode('utf-8') for token in tokens) for tokens in tokenised_sample]
+        results['sentence_likelihood'] = {'latency_ms': latencies(bm.sentence_likelihood, [(line,) for line in joined])}
+        start = time.time()
+        bm.batch_log_likelihood(sample)
+        seconds = time.time() - start
+        results['batch_log_likelihood'] = {'sentences': len(sample), 'seconds': seconds,
+                                           'sentences_per_sec': len(sample) / max(seconds, 1e-9)}
+
+        offsets = [(line, rng.randint(1, len(tokens))) for line, tokens in zip(sample, tokenised_sample) if tokens]
+
+        def cold(line, offset):
+            bm.clear_caches()
+            bm.find_max_edit_likelihood(line, offset)
+        results['find_max_edit_likelihood'] = {'latency_ms': latencies(cold, offsets),
+                                               'cached_latency_ms': latencies(bm.find_max_edit_likelihood, offsets)}
+        results['peak_memory_kb'] = peak_memory_kb()
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+def compare(old, new, path=''):
+    """Yields (metric, old value, new value) for the numbers found in both result dicts."""
+    for key in sorted(set(old) & set(new)):
+        if key in ('options', 'n'):
+            continue
+        name = path + '.' + key if path else key
+        if isinstance(old[key], dict) and isinstance(new[key], dict):
+            for item in compare(old[key], new[key], name):
+                yield item
+        elif isinstance(old[key], (int, long, float)) and isinstance(new[key], (int, long, float)):
+            yield name, old[key], new[key]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="benchmark",
+                                     description="Benchmarks the spell checker on a synthetic corpus, results as JSON")
+    parser.add_argument('--sentences', dest="SENTENCES", type=int, default=10000, help="sentences in the corpus")
+    parser.add_argument('--vocab', dest="VOCAB", type=int, default=5000, help="distinct words in the corpus")
+    parser.add_argument('--queries', dest="QUERIES", type=int, default=200, help="sentences to time the queries on")
+    parser.add_argument('--seed', dest="SEED", type=int, default=0)
+    parser.add_argument('--o', metavar='output', dest="OUTFILE", type=argparse.FileType('w'), default=sys.stdout, help="<results-file>")
+    parser.add_argument('--compare', metavar='results', dest="COMPARE", type=argparse.FileType('r'), help="<results-file> of an earlier run to compare with")
+    parser.add_argument('--build-memory', dest="BUILD_MEMORY", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.BUILD_MEMORY:
+        json.dump(measure_build_memory(args.BUILD_MEMORY), sys.stdout)
+        sys.exit()
+
+    results = run(args.SENTENCES, args.VOCAB, args.QUERIES, args.SEED)
+    json.dump(results, args.OUTFILE, indent=2, sort_keys=True)
+    args.OUTFILE.write('\n')
+    args.OUTFILE.close()
+    if args.COMPARE:
+        for name, old, new in compare(json.load(args.COMPARE), results):
+            sys.stderr.write('%-50s %12.3f %12.3f %7.2fx\n' % (name, old, new, new / old if old else float('inf')))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Deletion index over the vocabulary for spelling candidate generation.
+
+The edit rules of a script (see edit_rules.py) only insert or delete a soft
+character, or replace one replaceable character by another. Every word in
+the vocabulary is indexed under all its variants with up to two soft
+characters deleted or replaceable characters masked by a wildcard (SymSpell
+style), so a query only has to generate its own few variants and look them
+up, instead of enumerating every edit2 string and checking it against the
+vocabulary. A shared key only bounds the edits of the query and of the
+word together (by twice max_edits), so every hit is then checked against
+the rules, from both ends: the words max_edits//2 inverse edits from the
+hit have to meet those the rest of the edits make of the query.
+"""
+
+from edit_rules import get_edit_rules
+
+WILDCARD = u'\x00'                      # never left in text by the tokenizer
+MAX_EDITS = 2
+
+
+def variants(word, max_edits=MAX_EDITS, rules=None):
+    """
+    All keys of a unicode word under rules (default: Devanagari), including
+    the word itself. Deleting a soft character or masking a replaceable one
+    costs one edit; deleting any other replaceable character costs two,
+    since the rules reach that by a replace followed by a deletion.
+    """
+    rules = rules or get_edit_rules()
+    replaceable = rules.replaceable
+    soft = rules.soft
+    cost = {word: 0}
+    frontier = [word]
+    while frontier:
+        next_frontier = []
+        for key in frontier:
+            spent = cost[key]
+            for i, ch in enumerate(key):
+                if ch not in replaceable:
+                    continue
+                edits = [(key[:i] + WILDCARD + key[i + 1:], spent + 1)]
+                if ch in soft:
+                    edits.append((key[:i] + key[i + 1:], spent + 1))
+                else:
+                    edits.append((key[:i] + key[i + 1:], spent + 2))
+                for edited, edited_cost in edits:
+                    if edited_cost <= max_edits and edited_cost < cost.get(edited, max_edits + 1):
+                        cost[edited] = edited_cost
+                        next_frontier.append(edited)
+        frontier = next_frontier
+    return cost.viewkeys()
+
+
+class CandidateIndex:
+    """
+    Maps the utf-8 encoded variants of every vocabulary word (with a
+    count) to word ids. A key shared by a single word holds its id
+    directly, otherwise a list.
+    """
+
+    def __init__(self, vocab, max_edits=MAX_EDITS, rules=None):
+        self.vocab = vocab
+        self.max_edits = max_edits
+        self.rules = rules or get_edit_rules()
+        self.keys = {}
+        for i in xrange(len(vocab)):
+            if vocab.count(i) > 0:      # not a word whose text was removed again
+                self.add(i)
+
+    def add(self, i):
+        keys = self.keys
+        for key in variants(self.vocab.word(i).decode('utf-8'), self.max_edits, self.rules):
+            key = key.encode('utf-8')
+            ids = keys.get(key)
+            if ids is None:
+                keys[key] = i
+            elif isinstance(ids, list):
+                ids.append(i)
+            else:
+                keys[key] = [ids, i]
+
+    def remove(self, i):
+        keys = self.keys
+        for key in variants(self.vocab.word(i).decode('utf-8'), self.max_edits, self.rules):
+            key = key.encode('utf-8')
+            ids = keys.get(key)
+            if ids == i:
+                del keys[key]
+            elif isinstance(ids, list) and i in ids:
+                ids.remove(i)
+                if len(ids) == 1:
+                    keys[key] = ids[0]
+
+    def candidate_ids(self, word):
+        """Ids of the vocabulary words within max_edits edits of word (utf-8)."""
+        keys = self.keys
+        word = word.decode('utf-8')
+        found = set()
+        for key in variants(word, self.max_edits, self.rules):
+            ids = keys.get(key.encode('utf-8'))
+            if ids is None:
+                continue
+            if isinstance(ids, list):
+                found.update(ids)
+            else:
+                found.add(ids)
+        if not found:
+            return found
+        rules = self.rules
+        word_of = self.vocab.word
+        half = self.max_edits // 2
+        nearby = rules.within(word, self.max_edits - half)
+        return set(i for i in found if not nearby.isdisjoint(rules.within(word_of(i).decode('utf-8'), half, inverse=True)))
+
+    def candidates(self, word):
+        word_of = self.vocab.word
+        return [word_of(i) for i in self.candidate_ids(word)]
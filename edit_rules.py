@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Spelling edit rules per script, for the languages of indic_tokenizer.
+
+A script's rules are two codepoint tables: replaceable characters, which an
+edit may swap for one another, and soft characters among them, which an
+edit may also insert or delete. These are the vowel signs, independent
+vowels, nukta, virama and nasal marks that are most often mistyped.
+
+The Brahmic scripts share the block layout of ISCII, so their tables are
+the offsets of the original Hindi rules (ी ि ु े ै ो ौ ़ ् ं ँ आ अ ए ऐ ओ औ
+इ ई ा ू, soft ि ु े ़ ् ं ँ) applied to each block, keeping the characters
+the block assigns. The Dravidian scripts add their short e and o, Gurmukhi
+its tippi and addak, and Urdu has a table of its own. Every table is built
+once, at import.
+"""
+
+import unicodedata
+
+REPLACE_OFFSETS = (0x01, 0x02, 0x05, 0x06, 0x07, 0x08, 0x0F, 0x10, 0x13, 0x14,
+                   0x3C, 0x3E, 0x3F, 0x40, 0x41, 0x42, 0x47, 0x48, 0x4B, 0x4C, 0x4D)
+SOFT_OFFSETS = (0x01, 0x02, 0x3C, 0x3F, 0x41, 0x47, 0x4D)
+SHORT_E_O_OFFSETS = (0x0E, 0x12, 0x46, 0x4A)
+
+BLOCKS = {'dev': 0x0900, 'ben': 0x0980, 'pan': 0x0A00, 'guj': 0x0A80, 'ori': 0x0B00,
+          'tam': 0x0B80, 'tel': 0x0C00, 'kan': 0x0C80, 'mal': 0x0D00}
+LANGUAGE_SCRIPTS = {'hin': 'dev', 'mar': 'dev', 'nep': 'dev', 'bod': 'dev', 'kok': 'dev',
+                    'ben': 'ben', 'asm': 'ben', 'pan': 'pan', 'guj': 'guj', 'ori': 'ori',
+                    'tam': 'tam', 'tel': 'tel', 'kan': 'kan', 'mal': 'mal', 'urd': 'urd'}
+
+# Urdu: the harakat, superscript alif and hamza above are soft; alif, waw,
+# the yehs, hehs, noon and noon ghunna are confused with one another
+URDU_SOFT = u'ًٌٍَُِّْٰٔ'
+URDU_REPLACEABLE = URDU_SOFT + u'ءآئانهويںھہیے'
+
+
+class EditRules:
+    """One edit: replace a replaceable character, delete a soft one, or
+    insert a soft one where neither neighbour is replaceable."""
+
+    def __init__(self, replaceable, soft):
+        self.replaceable = frozenset(replaceable)
+        self.soft = frozenset(soft) & self.replaceable
+        ordered = sorted(self.replaceable)
+        self.replacements = dict((ch, tuple(other for other in ordered if other != ch)) for ch in ordered)
+        self.insertions = tuple(sorted(self.soft))
+
+    def edits1(self, word):
+        """Set of the unicode words one edit away from word, and word itself."""
+        replaceable = self.replaceable
+        soft = self.soft
+        replacements = self.replacements
+        insertions = self.insertions
+        edits = set([word])
+        add = edits.add
+        for i in xrange(len(word) + 1):
+            head, ch, tail = word[:i], word[i:i + 1], word[i + 1:]
+            if ch in replaceable:
+                if ch in soft:
+                    add(head + tail)
+                for other in replacements[ch]:
+                    add(head + other + tail)
+            elif head[-1:] not in replaceable:
+                rest = word[i:]
+                for other in insertions:
+                    add(head + other + rest)
+        return edits
+
+    def edits2(self, word):
+        edits1 = self.edits1
+        return set(e2 for e1 in edits1(word) for e2 in edits1(e1))
+
+    def sources1(self, word):
+        """Set of the unicode words that edits1 takes to word, and word itself: the inverse edits."""
+        replaceable = self.replaceable
+        soft = self.soft
+        replacements = self.replacements
+        insertions = self.insertions
+        edits = set([word])
+        add = edits.add
+        for i in xrange(len(word) + 1):
+            head, ch, tail = word[:i], word[i:i + 1], word[i + 1:]
+            rest = word[i:]
+            for other in insertions:            # word is other deleted
+                add(head + other + rest)
+            if ch in replaceable:
+                for other in replacements[ch]:
+                    add(head + other + tail)
+                if ch in soft and head[-1:] not in replaceable and tail[:1] not in replaceable:
+                    add(head + tail)            # word is ch inserted
+        return edits
+
+    def within(self, word, max_edits, inverse=False):
+        """Set of the unicode words max_edits edits away from word or closer,
+        or with inverse=True, of the words that reach word in as many edits."""
+        step = self.sources1 if inverse else self.edits1
+        words = set([word])
+        for _ in xrange(max_edits):
+            words = set(e for w in words for e in step(w))
+        return words
+
+
+def _assigned(codepoints):
+    return [unichr(c) for c in codepoints if unicodedata.name(unichr(c), None)]
+
+
+def _brahmic_rules(script):
+    base = BLOCKS[script]
+    replace = list(REPLACE_OFFSETS)
+    soft = list(SOFT_OFFSETS)
+    if script in ('tam', 'tel', 'kan', 'mal'):
+        replace.extend(SHORT_E_O_OFFSETS)
+    if script == 'pan':
+        replace.extend((0x70, 0x71))
+        soft.extend((0x70, 0x71))
+    return EditRules(_assigned(base + offset for offset in replace), _assigned(base + offset for offset in soft))
+
+
+RULES = dict((script, _brahmic_rules(script)) for script in BLOCKS)
+RULES['urd'] = EditRules(URDU_REPLACEABLE, URDU_SOFT)
+
+
+def get_edit_rules(lang='hin'):
+    """EditRules of the script lang is written in."""
+    return RULES[LANGUAGE_SCRIPTS[lang]]
@@ -5,6 +5,7 @@ import re
 import sys
 import os.path
 import argparse
+from functools import partial
 
 ENCHANT = True
 
@@ -13,6 +14,53 @@ try:
 except ImportError:
     ENCHANT = False
 
+# per script: (native digits, letters, special symbols split out, digits for the hyphen rule)
+SCRIPTS = dict()
+for _lang in ["hin", "mar", "nep", "bod", "kok"]:
+    SCRIPTS[_lang] = (u'\u0966-\u096f', u'\u0900-\u0965\u0970-\u097f', None, u'\u0966-\u096f')
+for _lang in ["ben", "asm"]:
+    SCRIPTS[_lang] = (u'\u09e6-\u09ef', u'\u0980-\u09e5\u09f0-\u09ff', u'\u09f2\u09f3\u09fa\u09fb', u'\u09e6-\u09ef')
+SCRIPTS['guj'] = (u'\u0ae6-\u0aef', u'\u0A80-\u0AE5\u0Af0-\u0Aff', u'\u0AD0\u0AF1', u'\u0ae6-\u0aef')
+SCRIPTS['mal'] = (u'\u0d66-\u0d6f', u'\u0D00-\u0D65\u0D73-\u0D7f', u'\u0d73\u0d74\u0d75', u'\u0d66-\u0D72')
+SCRIPTS['pan'] = (u'\u0a66-\u0a6f', u'\u0A00-\u0A65\u0A70-\u0A7f', None, u'\u0a66-\u0a6f')
+SCRIPTS['tel'] = (u'\u0c66-\u0c6f', u'\u0c00-\u0c65\u0c70-\u0c7f', u'\u0c78-\u0c7f', u'\u0c66-\u0c6f')
+SCRIPTS['tam'] = (u'\u0be6-\u0bef', u'\u0B80-\u0Be5\u0Bf3-\u0Bff', u'\u0bd0\u0bf3-\u0bff', u'\u0be6-\u0bf2')
+SCRIPTS['kan'] = (u'\u0ce6-\u0cef', u'\u0C80-\u0Ce5\u0Cf1-\u0Cff', None, u'\u0ce6-\u0cef')
+SCRIPTS['ori'] = (u'\u0b66-\u0b6f', u'\u0B00-\u0B65\u0B70-\u0B7f', u'\u0B72-\u0B77', u'\u0b66-\u0b6f')
+
+_shared = dict()
+
+def nonbreaking_prefixes():
+    """The NONBREAKING_PREFIXES table, read from disk once per process."""
+    if 'NBP' not in _shared:
+        file_path = os.path.abspath(__file__).rpartition('/')[0]
+        #load nonbreaking prefixes from file
+        with open('%s/NONBREAKING_PREFIXES' %file_path) as fp:
+            NBP = dict()
+            for line in fp:
+                if not line.startswith('#'):
+                    if '#NUMERIC_ONLY#' in line:
+                        NBP[line.replace('#NUMERIC_ONLY#', '').split()[0]] = 2
+                    else:
+                        NBP[line.strip()] = 1
+        _shared['NBP'] = NBP
+    return _shared['NBP']
+
+def english_dictionary():
+    if 'en_dict' not in _shared:
+        _shared['en_dict'] = enchant.Dict('en_US')
+    return _shared['en_dict']
+
+def get_tokenizer(lang='hin'):
+    """
+    Shared tokenizer for lang. Created once per process and, when created
+    before forking, inherited by worker processes as well.
+    """
+    key = 'tokenizer', lang
+    if key not in _shared:
+        _shared[key] = tokenizer(lang)
+    return _shared[key]
+
 class tokenizer():
     def __init__(self, lang='hin'):
         self.lang = lang
@@ -25,9 +73,8 @@ class tokenizer():
         self.ZERO_WIDTH_JOINER=u'\u200D'
         self.ZERO_WIDTH_NON_JOINER=u'\u200C'
 
-        file_path = os.path.abspath(__file__).rpartition('/')[0]
         if ENCHANT:
-            self.en_dict = enchant.Dict('en_US')
+            self.en_dict = english_dictionary()
 
         self.ben = lang in ["ben", "asm"]
         self.dev = lang in ["hin", "mar", "nep", "bod", "kok"]
@@ -40,15 +87,8 @@ class tokenizer():
 	self.pan = lang == 'pan'
 	self.ori = lang == 'ori'
 
-        #load nonbreaking prefixes from file
-	with open('%s/NONBREAKING_PREFIXES' %file_path) as fp:
-	    self.NBP = dict()
-	    for line in fp:
-		if not line.startswith('#'):
-		    if '#NUMERIC_ONLY#' in line:
-			self.NBP[line.replace('#NUMERIC_ONLY#', '').split()[0]] = 2
-		    else:
-			self.NBP[line.strip()] = 1
+        self.NBP = nonbreaking_prefixes()
+        self._compile()
 
     def normalize(self,text):
         """
@@ -71,54 +111,132 @@ class tokenizer():
 
         return text
 
-    def tokenize(self, text):
-        #text = ' %s ' %' '.join(text.split())
-        text = ' %s ' %' '.join(text.split())
-        # remove junk characters
-        text = re.sub('[\x00-\x1f]', '', text)
-        # seperate out on Latin-1 supplementary characters
-        text = re.sub(u'([\xa1-\xbf\xd7\xf7])', r' \1 ', text)        
-        # seperate out on general unicode punctituations except "’"
-        text = re.sub(u'([\u2000-\u2018\u201a-\u206f])', r' \1 ', text)        
-        # seperate out on unicode mathematical operators
-        text = re.sub(u'([\u2200-\u22ff])', r' \1 ', text)        
-        # seperate out on unicode fractions
-        text = re.sub(u'([\u2150-\u2160])', r' \1 ', text)        
-        # seperate out on unicode superscripts and subscripts
-        text = re.sub(u'([\u2070-\u209f])', r' \1 ', text)        
-        # seperate out on unicode currency symbols
-        text = re.sub(u'([\u20a0-\u20cf])', r' \1 ', text)        
-        # seperate out all "other" ASCII special characters
-        text = re.sub(u"([^\u0080-\U0010ffffa-zA-Z0-9\s\.'`,-])", r' \1 ', text)        
+    def _compile(self):
+        """
+        Compiles every pattern tokenize() needs for self.lang once. Each
+        stage is a list of steps, functions from text to text.
+        """
+        def sub(pattern, repl):
+            return partial(re.compile(pattern).sub, repl)
+
+        def replace(old, new):
+            return lambda text: text.replace(old, new)
 
-        #keep multiple dots together
-        text = re.sub(r'(\.\.+)([^\.])', lambda m: r' %sMULTI %s' %('DOT'*len(m.group(1)), m.group(2)), text)
-	if self.urd:
-	    #keep multiple dots (urdu-dots) together
-	    text = re.sub(u'(\u06d4\u06d4+)([^\u06d4])', lambda m: r' %sMULTI %s' %('DOTU'*len(m.group(1)), m.group(2)), text)
-	else:
-	    #keep multiple purna-viram together
-	    text = re.sub(u'(\u0964\u0964+)([^\u0964])', lambda m: r' %sMULTI %s' %('PNVM'*len(m.group(1)), m.group(2)), text)
-	    #keep multiple purna deergh-viram together
-	    text = re.sub(u'(\u0965\u0965+)([^\u0965])', lambda m: r' %sMULTI %s' %('DGVM'*len(m.group(1)), m.group(2)), text)
+        # junk characters out, then one pass seperating out Latin-1 supplementary
+        # characters, general unicode punctuations except "’", mathematical
+        # operators, fractions, super/subscripts, currency symbols and all
+        # "other" ASCII special characters
+        self.separate_steps = [
+            sub('[\x00-\x1f]', ''),
+            sub(u"([\xa1-\xbf\xd7\xf7\u2000-\u2018\u201a-\u206f\u2200-\u22ff\u2150-\u2160\u2070-\u209f\u20a0-\u20cf]|"
+                u"[^\u0080-\U0010ffffa-zA-Z0-9\s\.'`,-])", r' \1 '),
+            #keep multiple dots together
+            sub(r'(\.\.+)([^\.])', lambda m: r' %sMULTI %s' %('DOT'*len(m.group(1)), m.group(2))),
+        ]
+        if self.urd:
+            #keep multiple dots (urdu-dots) together
+            self.separate_steps.append(sub(u'(\u06d4\u06d4+)([^\u06d4])', lambda m: r' %sMULTI %s' %('DOTU'*len(m.group(1)), m.group(2))))
+        else:
+            #keep multiple purna-viram together
+            self.separate_steps.append(sub(u'(\u0964\u0964+)([^\u0964])', lambda m: r' %sMULTI %s' %('PNVM'*len(m.group(1)), m.group(2))))
+            #keep multiple purna deergh-viram together
+            self.separate_steps.append(sub(u'(\u0965\u0965+)([^\u0965])', lambda m: r' %sMULTI %s' %('DGVM'*len(m.group(1)), m.group(2))))
         #split contractions right (both "'" and "’")
-        text = re.sub(u"([^a-zA-Z\u0080-\u024f])(['\u2019])([^a-zA-Z\u0080-\u024f])", r"\1 \2 \3", text)
-        text = re.sub(u"([^a-zA-Z0-9\u0966-\u096f\u0080-\u024f])(['\u2019])([a-zA-Z\u0080-\u024f])", r"\1 \2 \3", text)
-        text = re.sub(u"([a-zA-Z\u0080-\u024f])(['\u2019])([^a-zA-Z\u0080-\u024f])", r"\1 \2 \3", text)
-        text = re.sub(u"([a-zA-Z\u0080-\u024f])(['\u2019])([a-zA-Z\u0080-\u024f])", r"\1 \2\3", text)
-        text = re.sub(u"([0-9\u0966-\u096f])(['\u2019])s", r"\1 \2s", text)
-        text = text.replace("''", " ' ' ")
+        self.separate_steps += [
+            sub(u"([^a-zA-Z\u0080-\u024f])(['\u2019])([^a-zA-Z\u0080-\u024f])", r"\1 \2 \3"),
+            sub(u"([^a-zA-Z0-9\u0966-\u096f\u0080-\u024f])(['\u2019])([a-zA-Z\u0080-\u024f])", r"\1 \2 \3"),
+            sub(u"([a-zA-Z\u0080-\u024f])(['\u2019])([^a-zA-Z\u0080-\u024f])", r"\1 \2 \3"),
+            sub(u"([a-zA-Z\u0080-\u024f])(['\u2019])([a-zA-Z\u0080-\u024f])", r"\1 \2\3"),
+            sub(u"([0-9\u0966-\u096f])(['\u2019])s", r"\1 \2s"),
+            replace("''", " ' ' "),
+        ]
+        self.has_letter = re.compile('[a-zA-Z]')
+
+        self.script_steps = []
+        self.hyphen_steps = [sub('(-+)', lambda m: r'%s' %('\n'.join('-'*len(m.group(1)))))]
+        script = SCRIPTS.get(self.lang)
+        if script is not None:
+            digits, letters, specials, hyphen_digits = script
+            #seperate out "," except for native and Ascii digits
+            self.script_steps += [
+                sub(u'([^0-9%s]),' %digits, r'\1 , '),
+                sub(u',([^0-9%s])' %digits, r' , \1'),
+            ]
+            #separate out on native characters followed by non-native characters or purna viram or deergh viram and vice-versa
+            self.script_steps += [
+                sub(u'([%s])([^%s]|[\u0964-\u0965])' %(letters, letters), r'\1 \2'),
+                sub(u'([^%s]|[\u0964-\u0965])([%s])' %(letters, letters), r'\1 \2'),
+            ]
+            #seperate out special symbols (currency signs, fractions etc.)
+            if specials:
+                self.script_steps.append(sub(u'([%s])' %specials, r' \1 '))
+            self.hyphen_steps.append(sub(u'(-?[0-9%s]-+[0-9%s]-?){,}' %(hyphen_digits, hyphen_digits),
+                                         lambda m: r'%s' %(m.group().replace('-', ' - '))))
+        elif self.urd:
+            urdu = u'\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ff'
+            self.script_steps += [
+                #seperate out urdu full-stop i.e., "۔"
+                replace(u'\u06d4', u' \u06d4 '),
+                #seperate out urdu quotation marks i.e., "٬"
+                replace(u'\u066c', u' \u066c '),
+                #seperate out Urdu comma i.e., "،" except for Urdu digits
+                sub(u'([^\u0660-\u0669\u06f0-\u06f9])\u060c', ur'\1 \u060c '),
+                sub(u'\u060c([^\u0660-\u0669\u06f0-\u06f9])', ur' \u060c \1'),
+                #separate out on Urdu characters followed by non-Urdu characters and vice-versa
+                sub(u'([%s])([^%s])' %(urdu, urdu), r'\1 \2'),
+                sub(u'([^%s])([%s])' %(urdu, urdu), r'\1 \2'),
+                #separate out on every other special character
+                sub(u'([\u0600-\u0607\u0609\u060a\u060d\u060e\u0610-\u0614\u061b-\u061f\u066a-\u066d\u06dd\u06de\u06e9])', r' \1 '),
+            ]
+            self.hyphen_steps.append(sub(u'(-?[0-9\u0660-\u0669\u06f0-\u06f9]-+[0-9\u0660-\u0669\u06f0-\u06f9]-?){,}',
+                                         lambda m: r'%s' %(m.group().replace('-', ' - '))))
+        if not self.urd:
+            self.script_steps += [
+                #Normalize "|" to purna viram
+                replace('|', u'\u0964'),
+                #Normalize ". ।" to "।"
+                sub(u'\.\s+\u0964', u'\u0964'),
+            ]
+
+        #restore multiple dots, purna virams and deergh virams
+        self.restore_steps = [sub(r'(DOT)(\1*)MULTI', lambda m: r'.%s' %('.'*(len(m.group(2))/3)))]
+        if self.urd:
+            self.restore_steps += [
+                sub(r'(DOTU)(\1*)MULTI', lambda m: u'\u06d4%s' %(u'\u06d4'*(len(m.group(2))/3))),
+            ]
+        else:
+            self.restore_steps += [
+                sub(r'(PNVM)(\1*)MULTI', lambda m: u'\u0964%s' %(u'\u0964'*(len(m.group(2))/4))),
+                sub(r'(DGVM)(\1*)MULTI', lambda m: u'\u0965%s' %(u'\u0965'*(len(m.group(2))/4))),
+            ]
+        #split sentences
+        if self.urd:
+            self.sentence_steps = [
+                sub(u' ([!.?\u06d4]) ([\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ffa-zA-Z])', r' \1\n\2'),
+                sub(u' ([!.?\u06d4]) ([\(\{\[\'"\u2018\u201c<]) ', r' \1 \2\n'),
+            ]
+        else:
+            self.sentence_steps = [
+                sub(u' ([!.?\u0964\u0965]) ([\u0900-\u0d7fa-zA-Z])', r' \1\n\2'),
+                sub(u' ([!.?\u0964\u0965]) ([\)\}\]\'"\u2019\u201d>]) ', r' \1 \2\n'),
+            ]
+
+    def _split(self, text):
+        """tokenize() up to splitting on whitespace; returns the space separated text."""
+        text = ' %s ' %' '.join(text.split())
+        for step in self.separate_steps:
+            text = step(text)
 
         #handle non-breaking prefixes
         words = text.split()
         text_len = len(words) - 1
-        text = str()
+        tokens = []
         for i,word in enumerate(words):
             if word.endswith('.'):
                 dotless = word[:-1]
                 if dotless.isdigit():
                     word = dotless + ' .'
-                elif ('.' in dotless and re.search('[a-zA-Z]', dotless)) or \
+                elif ('.' in dotless and self.has_letter.search(dotless)) or \
                     self.NBP.get(dotless, 0) == 1 or (i<text_len and words[i+1][0].islower()): pass
                 elif self.NBP.get(dotless, 0) == 2 and (i<text_len and words[i+1][0].isdigit()): pass
                 elif i < text_len and words[i+1][0].isdigit():
@@ -127,151 +245,48 @@ class tokenizer():
                         self.en_dict.check(dotless.title()))):
                         word = dotless + ' .'
                 else: word = dotless + ' .'
-            text += "%s " %word
+            tokens.append(word)
+        text = ' '.join(tokens) + ' ' if tokens else str()
 
-        if self.dev:
-            #seperate out "," except for Hindi and Ascii digits
-	    text = re.sub(u'([^0-9\u0966-\u096f]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0966-\u096f])', r' , \1', text)
-	    #separate out on Hindi characters followed by non-Hindi characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0900-\u0965\u0970-\u097f])([^\u0900-\u0965\u0970-\u097f]|[\u0964\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0900-\u0965\u0970-\u097f]|[\u0964\u0965])([\u0900-\u0965\u0970-\u097f])', r'\1 \2', text)
-        elif self.ben:
-            #seperate out "," except for Bengali and Ascii digits
-	    text = re.sub(u'([^0-9\u09e6-\u09ef]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u09e6-\u09ef])', r' , \1', text)
-	    #separate out on Bengali characters followed by non-Bengali characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0980-\u09e5\u09f0-\u09ff])([^\u0980-\u09e5\u09f0-\u09ff]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0980-\u09e5\u09f0-\u09ff]|[\u0964-\u0965])([\u0980-\u09e5\u09f0-\u09ff])', r'\1 \2', text)
-            #seperate out Bengali special chars (currency signs, BENGALI ISSHAR)
-            text = re.sub(u'([\u09f2\u09f3\u09fa\u09fb])', r' \1 ', text)
-        elif self.guj:
-            #seperate out "," except for Gujrati and Ascii digits
-	    text = re.sub(u'([^0-9\u0ae6-\u0aef]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0ae6-\u0aef])', r' , \1', text)
-	    #separate out on Gujrati characters followed by non-Gujrati characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0A80-\u0AE5\u0Af0-\u0Aff])([^\u0A80-\u0AE5\u0Af0-\u0Aff]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0A80-\u0AE5\u0Af0-\u0Aff]|[\u0964-\u0965])([\u0A80-\u0AE5\u0Af0-\u0Aff])', r'\1 \2', text)
-            #seperate out Gujurati special chars (currency signs, GUJARATI OM)
-            text = re.sub(u'([\u0AD0\u0AF1])', r' \1 ', text)
-        elif self.mal:
-            #seperate out "," except for Malayalam and Ascii digits
-	    text = re.sub(u'([^0-9\u0d66-\u0d6f]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0d66-\u0d6f])', r' , \1', text)
-	    #separate out on Malayalam characters followed by non-Malayalam characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0D00-\u0D65\u0D73-\u0D7f])([^\u0D00-\u0D65\u0D73-\u0D7f]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0D00-\u0D65\u0D73-\u0D7f]|[\u0964-\u0965])([\u0D00-\u0D65\u0D73-\u0D7f])', r'\1 \2', text)
-            #seperate out Malayalam fraction symbols
-            text = re.sub(u'([\u0d73\u0d74\u0d75])', r' \1 ', text)
-        elif self.pan:
-            #seperate out "," except for Punjabi and Ascii digits
-	    text = re.sub(u'([^0-9\u0a66-\u0a6f]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0a66-\u0a6f])', r' , \1', text)
-	    #separate out on Punjabi characters followed by non-Punjabi characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0A00-\u0A65\u0A70-\u0A7f])([^\u0A00-\u0A65\u0A70-\u0A7f]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0A00-\u0A65\u0A70-\u0A7f]|[\u0964-\u0965])([\u0A00-\u0A65\u0A70-\u0A7f])', r'\1 \2', text)
-        elif self.tel:
-            #seperate out "," except for Telugu and Ascii digits
-	    text = re.sub(u'([^0-9\u0c66-\u0c6f]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0c66-\u0c6f])', r' , \1', text)
-	    #separate out on Telugu characters followed by non-Telugu characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0c00-\u0c65\u0c70-\u0c7f])([^\u0c00-\u0c65\u0c70-\u0c7f]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0c00-\u0c65\u0c70-\u0c7f]|[\u0964-\u0965])([\u0c00-\u0c65\u0c70-\u0c7f])', r'\1 \2', text)
-            #separate out Telugu fractions and weights
-            text = re.sub(u'([\u0c78-\u0c7f])', r' \1 ', text)
-        elif self.tam:
-            #seperate out "," except for Tamil and Ascii digits
-	    text = re.sub(u'([^0-9\u0be6-\u0bef]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0be6-\u0bef])', r' , \1', text)
-	    #separate out on Tamil characters followed by non-Tamil characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0B80-\u0Be5\u0Bf3-\u0Bff])([^\u0B80-\u0Be5\u0Bf3-\u0Bff]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0B80-\u0Be5\u0Bf3-\u0Bff]|[\u0964-\u0965])([\u0B80-\u0Be5\u0Bf3-\u0Bff])', r'\1 \2', text)
-            #seperate out Tamil special symbols (calendrical, clerical, currency signs etc.)
-            text = re.sub(u'([\u0bd0\u0bf3-\u0bff])', r' \1 ', text)
-        elif self.kan:
-            #seperate out "," except for Kanadda and Ascii digits
-	    text = re.sub(u'([^0-9\u0ce6-\u0cef]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0ce6-\u0cef])', r' , \1', text)
-	    #separate out on Kanadda characters followed by non-Kanadda characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0C80-\u0Ce5\u0Cf1-\u0Cff])([^\u0C80-\u0Ce5\u0Cf1-\u0Cff]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0C80-\u0Ce5\u0Cf1-\u0Cff]|[\u0964-\u0965])([\u0C80-\u0Ce5\u0Cf1-\u0Cff])', r'\1 \2', text)
-        elif self.ori:
-            #seperate out "," except for Oriya and Ascii digits
-	    text = re.sub(u'([^0-9\u0b66-\u0b6f]),', r'\1 , ', text)
-	    text = re.sub(u',([^0-9\u0b66-\u0b6f])', r' , \1', text)
-	    #separate out on Oriya characters followed by non-Oriya characters or purna viram or deergh viram and vice-versa
-            text = re.sub(u'([\u0B00-\u0B65\u0B70-\u0B7f])([^\u0B00-\u0B65\u0B70-\u0B7f]|[\u0964-\u0965])', r'\1 \2', text)
-            text = re.sub(u'([^\u0B00-\u0B65\u0B70-\u0B7f]|[\u0964-\u0965])([\u0B00-\u0B65\u0B70-\u0B7f])', r'\1 \2', text)
-            #seperate out Oriya fraction symbols
-	    text = re.sub(u'([\u0B72-\u0B77])', r' \1 ', text)
-	elif self.urd:
-	    #seperate out urdu full-stop i.e., "۔"
-	    text = text.replace(u'\u06d4', u' \u06d4 ')
-	    #seperate out urdu quotation marks i.e., "٬"
-	    text = text.replace(u'\u066c', u' \u066c ')
-	    #seperate out Urdu comma i.e., "،" except for Urdu digits
-	    text = re.sub(u'([^\u0660-\u0669\u06f0-\u06f9])\u060C', ur'\1 \u060C ', text)
-	    text = re.sub(u'\u060C([^\u0660-\u0669\u06f0-\u06f9])', ur' \u060C \1', text)
-	    #separate out on Urdu characters followed by non-Urdu characters and vice-versa
-	    text = re.sub(u'([\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ff])' +
-			    u'([^\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ff])', r'\1 \2', text)
-	    text = re.sub(u'([^\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ff])' +
-			    u'([\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ff])', r'\1 \2', text)
-	    #separate out on every other special character
-	    text = re.sub(u'([\u0600-\u0607\u0609\u060a\u060d\u060e\u0610-\u0614\u061b-\u061f\u066a-\u066d\u06dd\u06de\u06e9])', 
-			    r' \1 ', text)
-
-	if not self.urd:
-	    #Normalize "|" to purna viram 
-	    text = text.replace('|', u'\u0964')
-	    #Normalize ". ।" to "।"
-	    text = re.sub(u'\.\s+\u0964', u'\u0964', text)
-       
-     #   text = re.sub('(-+)', lambda m: r'%s' %(' '.join('-'*len(m.group(1)))), text) 
-        text = re.sub('(-+)', lambda m: r'%s' %('\n'.join('-'*len(m.group(1)))), text) 
-        if self.dev:
-            text = re.sub(u'(-?[0-9\u0966-\u096f]-+[0-9\u0966-\u096f]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.ben:
-            text = re.sub(u'(-?[0-9\u09e6-\u09ef]-+[0-9\u09e6-\u09ef]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.guj:
-            text = re.sub(u'(-?[0-9\u0ae6-\u0aef]-+[0-9\u0ae6-\u0aef]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.mal:
-            text = re.sub(u'(-?[0-9\u0d66-\u0D72]-+[0-9\u0d66-\u0D72]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.pan:
-            text = re.sub(u'(-?[0-9\u0a66-\u0a6f]-+[0-9\u0a66-\u0a6f]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.tel:
-            text = re.sub(u'(-?[0-9\u0c66-\u0c6f]-+[0-9\u0c66-\u0c6f]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.tam:
-            text = re.sub(u'(-?[0-9\u0be6-\u0bf2]-+[0-9\u0be6-\u0bf2]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.kan:
-            text = re.sub(u'(-?[0-9\u0ce6-\u0cef]-+[0-9\u0ce6-\u0cef]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.ori:
-            text = re.sub(u'(-?[0-9\u0b66-\u0b6f]-+[0-9\u0b66-\u0b6f]-?){,}',lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        elif self.urd:
-            text = re.sub(u'(-?[0-9\u0660-\u0669\u06f0-\u06f9]-+[0-9\u0660-\u0669\u06f0-\u06f9]-?){,}',
-			    lambda m: r'%s' %(m.group().replace('-', ' - ')), text)
-        #text = ' '.join(text.split())
-        text = '\n'.join(text.split())
-        #restore multiple dots, purna virams and deergh virams
-        text = re.sub(r'(DOT)(\1*)MULTI', lambda m: r'.%s' %('.'*(len(m.group(2))/3)), text)
-	if self.urd:
-	    text = re.sub(r'(DOTU)(\1*)MULTI', lambda m: u'\u06d4%s' %(u'\u06d4'*(len(m.group(2))/3)), text)
-	else:
-	    text = re.sub(r'(PNVM)(\1*)MULTI', lambda m: u'\u0964%s' %(u'\u0964'*(len(m.group(2))/4)), text)
-	    text = re.sub(r'(DGVM)(\1*)MULTI', lambda m: u'\u0965%s' %(u'\u0965'*(len(m.group(2))/4)), text)
+        for step in self.script_steps:
+            text = step(text)
+        for step in self.hyphen_steps:
+            text = step(text)
+        return text
 
-	#split sentences
-	if self.urd: 
-	    text = re.sub(u' ([!.?\u06d4]) ([\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ffa-zA-Z])', r' \1\n\2', text)
-	    text = re.sub(u' ([!.?\u06d4]) ([\(\{\[\'"\u2018\u201c<]) ', r' \1 \2\n', text)
-	    #text = re.sub(u' ([!.?\u06d4]) ([^\u0617-\u061a\u0620-\u065f\u066e-\u06d3\u06d5\u06fa-\u06ffa-zA-Z]) ', r' \1 \2\n', text)
-	else: 
-	    text = re.sub(u' ([!.?\u0964\u0965]) ([\u0900-\u0d7fa-zA-Z])', r' \1\n\2', text)
-	    text = re.sub(u' ([!.?\u0964\u0965]) ([\)\}\]\'"\u2019\u201d>]) ', r' \1 \2\n', text)
-	    #text = re.sub(u' ([!.?\u0964\u0965]) ([^\u0900-\u0d7fa-zA-Z]) ', r' \1 \2\n', text)
-        
+    def tokenize(self, text):
+        text = '\n'.join(self._split(text).split())
+        for step in self.restore_steps:
+            text = step(text)
+        for step in self.sentence_steps:
+            text = step(text)
         return text
 
+    def tokenize_iter(self, text):
+        """
+        Yields the tokens of tokenize(text) one by one instead of joining
+        them. The sentence splitting patterns need spaces, which no longer
+        exist between tokens, so only the dot/viram restoring is applied.
+        """
+        for token in self._split(text).split():
+            if 'MULTI' in token:
+                for step in self.restore_steps:
+                    token = step(token)
+            yield token
+
+    def tokenize_stream(self, lines):
+        """
+        Yields the tokenised form of each input line: one token per line
+        followed by the "$$$" sentence separator, i.e. the layout of
+        corpus_tokenised.txt. Can be fed straight to the model builder.
+        """
+        for line in lines:
+            line = line.decode('utf-8')
+            line = self.normalize(line)
+            line = self.tokenize(line)
+            line = line.encode('utf-8')
+            yield '%s\n$$$\n' %line
+
 if __name__ == '__main__':
     
     lang_help = """select language (3 letter ISO-639 code)
@@ -303,12 +318,8 @@ if __name__ == '__main__':
     # initialize convertor object
     tzr = tokenizer(lang=args.lang)
     # convert data
-    for line in args.INFILE:
-        line = line.decode('utf-8')
-        line = tzr.normalize(line)
-        line = tzr.tokenize(line)
-        line = line.encode('utf-8')
-        args.OUTFILE.write('%s\n$$$\n' %line)
+    for line in tzr.tokenize_stream(args.INFILE):
+        args.OUTFILE.write(line)
 
     # close files 
     args.INFILE.close()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation for BigramModelSpellCheck.
+
+A model given metrics=Metrics() records the wall time of each stage it runs
+(build, tokenize, candidates, prune, score) and counters of the work done,
+eg. candidate words looked up against those found in the vocabulary.
+Without metrics the checker pays one "is not None" test per stage.
+"""
+
+import time
+
+
+class Metrics:
+    """
+    Per-stage timers and counters. callback(stage, seconds), when given,
+    is called as each stage ends, eg. to feed a per request trace.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.timers = {}        # stage -> [calls, seconds]
+        self.counters = {}
+
+    def add_time(self, stage, seconds):
+        timer = self.timers.get(stage)
+        if timer is None:
+            timer = self.timers[stage] = [0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+        if self.callback is not None:
+            self.callback(stage, seconds)
+
+    def since(self, stage, start):
+        """Records the time from start (a time.time() value) to now under stage."""
+        self.add_time(stage, time.time() - start)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.timers.clear()
+        self.counters.clear()
+
+    def snapshot(self):
+        """Plain dict of the timers and counters, eg. for json.dumps."""
+        return {'timers': dict((stage, {'calls': calls, 'seconds': seconds})
+                               for stage, (calls, seconds) in self.timers.iteritems()),
+                'counters': dict(self.counters)}
+
+    def report(self):
+        """One line per stage, slowest first, then the counters."""
+        lines = []
+        for stage, (calls, seconds) in sorted(self.timers.iteritems(), key=lambda item: -item[1][1]):
+            lines.append('%-12s %8d calls %10.4fs %10.4fms/call' % (stage, calls, seconds, seconds * 1000.0 / calls))
+        for name, n in sorted(self.counters.iteritems()):
+            lines.append('%-24s %d' % (name, n))
+        return '\n'.join(lines)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded LRU cache with an optional time to live, used by BigramModelSpellCheck
+in front of candidate generation and candidate ranking.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Keeps at most maxsize entries, evicting the least recently used one.
+    With ttl (seconds), entries older than that count as misses. maxsize=0
+    disables the cache.
+    """
+
+    def __init__(self, maxsize=100000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()    # key -> (stored at, value), oldest use first
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self.entries.pop(key, None)
+        if entry is None or (self.ttl is not None and time.time() - entry[0] > self.ttl):
+            self.misses += 1
+            return default
+        self.entries[key] = entry       # move to the most recently used end
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        self.entries.pop(key, None)
+        self.entries[key] = (time.time() if self.ttl is not None else 0, value)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {'size': len(self.entries), 'hits': self.hits, 'misses': self.misses}
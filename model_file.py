@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Binary model file for BigramModelSpellCheck.
+
+The file is read through mmap with no parsing: every table is a packed
+little-endian array at an 8-byte aligned offset recorded in the header, so
+processes opening the same model share its physical pages.
+
+    header     magic "BGLM", version, V, no. of bigrams, total tokens,
+               then the byte offset of each section below
+    offsets    int64[V+1]   word i is blob[offsets[i]:offsets[i+1]]
+    blob       utf-8 words, sorted bytewise, so word id == rank
+    counts     int64[V]     unigram counts
+    row_ptr    int64[V+1]   CSR row bounds into cols/vals
+    cols       int32[nnz]   second word ids, sorted within a row
+    vals       int64[nnz]   bigram counts
+    row_totals int64[V]     sum of each row, ie. count of a word as history,
+                            with the counts pruned into the sketch
+    sketch     int64[depth*width]  Count-Min Sketch of pruned bigrams (version
+               2, offset 0 when absent); its offset, depth and width follow
+               the version 1 header
+"""
+
+import os
+import mmap
+import struct
+import argparse
+from array import array
+from bisect import bisect_left
+from itertools import izip, islice
+
+from ngram_store import Vocabulary, BigramStore, count_stream, merge_counts
+from pruning import CountMinSketch
+
+MAGIC = 'BGLM'
+VERSION = 2
+SECTIONS = ('offsets', 'blob', 'counts', 'row_ptr', 'cols', 'vals', 'row_totals')
+HEADER = struct.Struct('<4sIQQQ' + 'Q' * len(SECTIONS))
+SKETCH_HEADER = struct.Struct('<QQQ')      # offset, depth, width; version 2 on
+
+
+class MappedArray:
+    """Read-only sequence view over a packed array inside a mmap."""
+
+    def __init__(self, buf, offset, typecode, length):
+        self.buf = buf
+        self.offset = offset
+        self.length = length
+        self.typecode = typecode
+        self.item = struct.Struct('<' + typecode)
+        self.itemsize = self.item.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError('MappedArray index out of range')
+        return self.item.unpack_from(self.buf, self.offset + i * self.itemsize)[0]
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        unpack_from = self.item.unpack_from
+        for pos in xrange(self.offset, self.offset + self.length * self.itemsize, self.itemsize):
+            yield unpack_from(self.buf, pos)[0]
+
+    def packed(self, start=0, stop=None):
+        """Items start:stop as stored in the file."""
+        stop = self.length if stop is None else stop
+        return self.buf[self.offset + start * self.itemsize:self.offset + stop * self.itemsize]
+
+    def unpack(self, start=0, stop=None):
+        """Items start:stop as a tuple, in one call."""
+        stop = self.length if stop is None else stop
+        return struct.unpack_from('<%d%s' % (stop - start, self.typecode), self.buf, self.offset + start * self.itemsize)
+
+
+class MappedVocabulary:
+    """
+    Vocabulary backed by a model file. Word ids are ranks in the sorted
+    word table, so lookup is a binary search over the mapped blob.
+    """
+
+    def __init__(self, buf, offsets, blob, counts, total):
+        self.buf = buf
+        self.offsets = offsets
+        self.blob = blob
+        self.counts = counts
+        self.total = total
+
+    def word(self, i):
+        return self.buf[self.blob + self.offsets[i]:self.blob + self.offsets[i + 1]]
+
+    def index(self, word):
+        lo, hi = 0, len(self.counts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.word(mid) < word:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.counts) and self.word(lo) == word:
+            return lo
+        return -1
+
+    def count(self, i):
+        if i < 0:
+            return 0
+        return self.counts[i]
+
+    def get(self, word, default=None):
+        i = self.index(word)
+        if i < 0:
+            return default
+        return self.counts[i]
+
+    def __getitem__(self, word):
+        i = self.index(word)
+        if i < 0:
+            raise KeyError(word)
+        return self.counts[i]
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        return (self.word(i) for i in xrange(len(self.counts)))
+
+    def iteritems(self):
+        return izip(self, self.counts)
+
+    def nbytes(self):
+        return 0    # everything lives in the shared mapping
+
+
+def _align(fp):
+    pad = -fp.tell() % 8
+    fp.write('\0' * pad)
+    return fp.tell()
+
+
+def _write_array(fp, typecode, values, batch=1 << 16):
+    values = iter(values)
+    while True:
+        chunk = list(islice(values, batch))
+        if not chunk:
+            break
+        fp.write(struct.pack('<%d%s' % (len(chunk), typecode), *chunk))
+
+
+def write_model(filename, vocab, store):
+    """
+    Writes vocab and store to filename, renumbering ids in sorted word order
+    and leaving out words whose count fell to zero. The file is written
+    aside and renamed over filename, so readers mapping the old file keep
+    a consistent view.
+    """
+    store.freeze()
+    order = sorted((i for i in xrange(len(vocab)) if vocab.count(i) > 0), key=vocab.word)     # new id -> old id
+    V = len(order)
+    new_id = array('l', [-1]) * len(vocab)
+    for rank, old in enumerate(order):
+        new_id[old] = rank
+
+    words = [vocab.word(old) for old in order]
+    offsets = array('l', [0])
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+    counts = array('l', (vocab.count(old) for old in order))
+
+    row_ptr = array('l', [0])
+    cols = array('i')
+    vals = array('l')
+    row_totals = array('l')
+    for old in order:
+        lo, hi = store.row(old)
+        row = sorted((new_id[store.cols[j]], store.vals[j]) for j in xrange(lo, hi) if new_id[store.cols[j]] >= 0)
+        for b, count in row:
+            cols.append(b)
+            vals.append(count)
+        row_ptr.append(len(cols))
+        row_totals.append(sum(count for b, count in row) + (store.pruned.get(old, 0) if store.pruned else 0))
+
+    with open(filename + '.tmp', 'wb') as fp:
+        fp.write('\0' * (HEADER.size + SKETCH_HEADER.size))
+        positions = []
+        for typecode, section in (('q', offsets), (None, ''.join(words)), ('q', counts), ('q', row_ptr),
+                                  ('i', cols), ('q', vals), ('q', row_totals)):
+            positions.append(_align(fp))
+            if typecode is None:
+                fp.write(section)
+            else:
+                _write_array(fp, typecode, section)
+        sketch = store.sketch
+        if sketch is None:
+            fp.seek(0)
+            fp.write(HEADER.pack(MAGIC, VERSION, V, len(cols), vocab.total, *positions))
+            fp.write(SKETCH_HEADER.pack(0, 0, 0))
+        else:
+            sketch_at = _align(fp)
+            _write_array(fp, 'q', sketch.table)
+            fp.seek(0)
+            fp.write(HEADER.pack(MAGIC, VERSION, V, len(cols), vocab.total, *positions))
+            fp.write(SKETCH_HEADER.pack(sketch_at, sketch.depth, sketch.width))
+    os.rename(filename + '.tmp', filename)
+
+
+def open_model(filename):
+    """Maps filename and returns (vocabulary, bigram store) views over it."""
+    with open(filename, 'rb') as fp:
+        buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    header = HEADER.unpack_from(buf, 0)
+    magic, version, V, nnz, total = header[:5]
+    if magic != MAGIC:
+        raise ValueError('%s is not a bigram model file' % filename)
+    if not 1 <= version <= VERSION:
+        raise ValueError('%s has model format version %d, expected at most %d' % (filename, version, VERSION))
+    at = dict(zip(SECTIONS, header[5:]))
+    vocab = MappedVocabulary(buf,
+                             MappedArray(buf, at['offsets'], 'q', V + 1),
+                             at['blob'],
+                             MappedArray(buf, at['counts'], 'q', V),
+                             total)
+    store = BigramStore(vocab)
+    store.row_ptr = MappedArray(buf, at['row_ptr'], 'q', V + 1)
+    store.cols = MappedArray(buf, at['cols'], 'i', nnz)
+    store.vals = MappedArray(buf, at['vals'], 'q', nnz)
+    store.row_totals = MappedArray(buf, at['row_totals'], 'q', V)
+    if version >= 2:
+        sketch_at, depth, width = SKETCH_HEADER.unpack_from(buf, HEADER.size)
+        if sketch_at:
+            store.sketch = CountMinSketch(width, depth, MappedArray(buf, sketch_at, 'q', depth * width))
+    return vocab, store
+
+
+def read_text_model(unigram_file, bigram_file):
+    """
+    Reads the tab separated dumps written by BigramModelSpellCheck.save_grams.
+    A bigram "a_b" is split at the first "_" leaving two known words, since
+    words may themselves contain "_".
+    """
+    vocab = Vocabulary()
+    with open(unigram_file) as fp:
+        for line in fp:
+            word, count = line.rstrip('\n').rsplit('\t', 1)
+            vocab.add(word, int(count))
+    store = BigramStore(vocab)
+    with open(bigram_file) as fp:
+        for line in fp:
+            bigram, count = line.rstrip('\n').rsplit('\t', 1)
+            at = bigram.find('_')
+            while at >= 0:
+                a = vocab.index(bigram[:at])
+                b = vocab.index(bigram[at + 1:])
+                if a >= 0 and b >= 0:
+                    store.add(a, b, int(count))
+                    break
+                at = bigram.find('_', at + 1)
+            else:
+                raise ValueError('bigram %r has words missing from %s' % (bigram, unigram_file))
+    store.freeze()
+    return vocab, store
+
+
+def convert_text_model(unigram_file, bigram_file, model_file):
+    vocab, store = read_text_model(unigram_file, bigram_file)
+    write_model(model_file, vocab, store)
+
+
+def merge_model_files(filenames, model_file):
+    """Sums the counts of several model files, eg. built on different days, into model_file."""
+    vocab = Vocabulary()
+    store = BigramStore(vocab)
+    for filename in filenames:
+        merge_counts(vocab, store, *open_model(filename))
+    write_model(model_file, vocab, store)
+
+
+def count_delta(added=(), removed=(), separator='$$$'):
+    """
+    Counts of the tokenised files in added less those of the files in
+    removed: (word -> count, (first word, second word) -> count, tokens).
+    """
+    words = {}
+    bigrams = {}
+    total = 0
+    for names, sign in ((added, 1), (removed, -1)):
+        for name in names:
+            vocab = Vocabulary()
+            store = BigramStore(vocab)
+            with open(name, 'rb') as fp:
+                count_stream(vocab, store, iter(lambda: fp.read(1 << 20), ''), separator)
+            total += sign * vocab.total
+            for word, count in vocab.iteritems():
+                words[word] = words.get(word, 0) + sign * count
+            cols, vals = store.cols, store.vals
+            for a in xrange(len(vocab)):
+                first = vocab.word(a)
+                lo, hi = store.row(a)
+                for j in xrange(lo, hi):
+                    key = first, vocab.word(cols[j])
+                    bigrams[key] = bigrams.get(key, 0) + sign * vals[j]
+    return words, bigrams, total
+
+
+def _runs(length, events, batch=1 << 18):
+    """
+    Walks positions 0..length in order: yields (lo, hi) for the runs of
+    positions without an event, and each event (position, replaces, ...)
+    as (None, event). An event with replaces set takes the place of its
+    position, the others go before it.
+    """
+    at = 0
+    for event in events + [None]:
+        end = length if event is None else event[0]
+        while at < end:
+            hi = min(end, at + batch)
+            yield (at, hi), None
+            at = hi
+        if event is not None:
+            yield None, event
+            if event[1]:
+                at = end + 1
+
+
+def update_model_file(filename, added=(), removed=(), model_file=None, separator='$$$'):
+    """
+    Adds the counts of the tokenised files in added to the model in
+    filename and subtracts those in removed, writing the result to
+    model_file (default: filename). Only the new text is counted, and the
+    model is not loaded: its mapped tables are copied to the new file with
+    the counts of the new text merged in, the runs of entries the new text
+    leaves alone being copied as they are, with their word ids shifted
+    past the words that come or go. ValueError is raised, and the model
+    file left as it was, if removed holds counts the model does not have.
+    """
+    vocab, store = open_model(filename)
+    words, bigrams, total = count_delta(added, removed, separator)
+    V, nnz = len(vocab), len(store.cols)
+    offsets = vocab.offsets.unpack()
+    counts = list(vocab.counts.unpack())
+    row_ptr = store.row_ptr.unpack()
+    text = vocab.buf[vocab.blob:vocab.blob + offsets[V]]
+
+    ids = {}        # word -> old id, -1 for a new word; every word of a bigram is one of words
+    ranks = {}      # word -> number of old words sorting before it
+    for word in words:
+        lo, hi = 0, V
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[offsets[mid]:offsets[mid + 1]] < word:
+                lo = mid + 1
+            else:
+                hi = mid
+        ranks[word] = lo
+        ids[word] = lo if lo < V and text[offsets[lo]:offsets[lo + 1]] == word else -1
+    word_events = []    # (old id,replaces,word,count): new words go before the first word sorting after them
+    for word, delta in words.iteritems():
+        i = ids[word]
+        count = (counts[i] if i >= 0 else 0) + delta
+        if count < 0:
+            raise ValueError('cannot remove %d occurrences of %r, the model has %d' % (-delta, word, count - delta))
+        if i >= 0:
+            counts[i] = count
+            if not count:
+                word_events.append((i, True, word, 0))     # removed from the model
+        elif count:
+            word_events.append((ranks[word], False, word, count))
+    word_events.sort()
+
+    remap = array('l')          # old id -> new id, -1 for a removed word
+    new_ids = {}                # new word -> id
+    blob = []
+    new_offsets = array('l', [0])
+    new_counts = array('l')
+    lengths = array('l')        # length and total of each row, in the new ids
+    totals = array('l')
+    for run, event in _runs(V, word_events):
+        if run is not None:
+            lo, hi = run
+            remap.extend(xrange(len(new_counts), len(new_counts) + hi - lo))
+            blob.append(text[offsets[lo]:offsets[hi]])
+            shift = new_offsets[-1] - offsets[lo]
+            new_offsets.extend(offset + shift for offset in offsets[lo + 1:hi + 1])
+            new_counts.extend(counts[lo:hi])
+            lengths.extend(row_ptr[i + 1] - row_ptr[i] for i in xrange(lo, hi))
+            totals.extend(store.row_totals.unpack(lo, hi))
+        elif event[1]:
+            remap.append(-1)
+        else:
+            new_ids[event[2]] = len(new_counts)
+            blob.append(event[2])
+            new_offsets.append(new_offsets[-1] + len(event[2]))
+            new_counts.append(event[3])
+            lengths.append(0)
+            totals.append(0)
+    left = dict((event[0], row_ptr[event[0] + 1] - row_ptr[event[0]]) for event in word_events if event[1])
+
+    entry_events = []   # (old position,replaces,new first id,new second id,count)
+    for (first, second), delta in bigrams.iteritems():
+        a, b = ids[first], ids[second]
+        lo, hi = (row_ptr[a], row_ptr[a + 1]) if a >= 0 else (row_ptr[ranks[first]],) * 2
+        j = bisect_left(store.cols, ranks[second], lo, hi)
+        old = store.vals[j] if b >= 0 and j < hi and store.cols[j] == b else 0
+        count = old + delta
+        if count < 0:
+            if store.sketch is None:
+                raise ValueError('cannot remove %d occurrences of the bigram %r %r, the model has %d'
+                                 % (-delta, first, second, old))
+            count = 0   # the counts of pruned bigrams are only estimates, they are dropped at zero instead
+        first_id = remap[a] if a >= 0 else new_ids.get(first, -1)
+        second_id = remap[b] if b >= 0 else new_ids.get(second, -1)
+        if first_id < 0 or second_id < 0:
+            count = 0
+        if count == old:
+            continue
+        entry_events.append((j, bool(old), first_id, second_id, count))
+        if first_id >= 0:
+            lengths[first_id] += (count > 0) - (old > 0)
+            totals[first_id] += count - old
+        elif old:
+            left[a] -= 1
+    entry_events.sort()
+    for i, n in left.iteritems():
+        if n:
+            raise ValueError('cannot remove %r, the model has %d bigrams starting with it left' % (vocab.word(i), n))
+
+    new_row_ptr = array('l', [0])
+    for length in lengths:
+        new_row_ptr.append(new_row_ptr[-1] + length)
+    shifted = bool(word_events)     # ids change after the first word added or removed
+    target = model_file or filename
+    try:
+        with open(target + '.tmp', 'wb') as fp:
+            fp.write('\0' * (HEADER.size + SKETCH_HEADER.size))
+            positions = []
+            for typecode, section in (('q', new_offsets), (None, ''.join(blob)), ('q', new_counts), ('q', new_row_ptr)):
+                positions.append(_align(fp))
+                if typecode is None:
+                    fp.write(section)
+                else:
+                    _write_array(fp, typecode, section)
+            positions.append(_align(fp))
+            for run, event in _runs(nnz, entry_events):
+                if run is None:
+                    if event[4]:
+                        fp.write(struct.pack('<i', event[3]))
+                elif not shifted:
+                    fp.write(store.cols.packed(*run))
+                else:
+                    cols = [remap[b] for b in store.cols.unpack(*run)]
+                    if min(cols) < 0:
+                        raise ValueError('cannot remove %r, the model has bigrams ending with it left'
+                                         % vocab.word(store.cols[run[0] + cols.index(min(cols))]))
+                    fp.write(struct.pack('<%di' % len(cols), *cols))
+            positions.append(_align(fp))
+            for run, event in _runs(nnz, entry_events):
+                if run is None:
+                    if event[4]:
+                        fp.write(struct.pack('<q', event[4]))
+                else:
+                    fp.write(store.vals.packed(*run))
+            positions.append(_align(fp))
+            _write_array(fp, 'q', totals)
+            sketch = store.sketch
+            sketch_at = 0
+            if sketch is not None:
+                sketch_at = _align(fp)
+                fp.write(sketch.table.packed())
+            fp.seek(0)
+            fp.write(HEADER.pack(MAGIC, VERSION, len(new_counts), new_row_ptr[-1], vocab.total + total, *positions))
+            fp.write(SKETCH_HEADER.pack(sketch_at, sketch.depth if sketch else 0, sketch.width if sketch else 0))
+    except Exception:
+        os.remove(target + '.tmp')
+        raise
+    os.rename(target + '.tmp', target)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="model_file",
+                                     description="Converts unigrams.txt/bigrams.txt dumps to a binary model file,\n"
+                                                 "merges binary model files with --merge, or updates one with --update",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--u', metavar='unigrams', dest="UNIGRAMS", default="unigrams.txt", help="<unigram-dump>")
+    parser.add_argument('--b', metavar='bigrams', dest="BIGRAMS", default="bigrams.txt", help="<bigram-dump>")
+    parser.add_argument('--merge', metavar='model', dest="MODELS", nargs='+', help="<model-files> to merge instead")
+    parser.add_argument('--update', metavar='model', dest="UPDATE", help="<model-file> to update with --add/--remove")
+    parser.add_argument('--add', metavar='tokenised', dest="ADD", nargs='+', default=[], help="<tokenised-files> to add")
+    parser.add_argument('--remove', metavar='tokenised', dest="REMOVE", nargs='+', default=[], help="<tokenised-files> to remove")
+    parser.add_argument('--o', metavar='output', dest="OUTFILE", default=None,
+                        help="<model-file> (default: the --update model itself, otherwise model.bglm)")
+    args = parser.parse_args()
+    if args.UPDATE:
+        update_model_file(args.UPDATE, args.ADD, args.REMOVE, args.OUTFILE)
+    elif args.MODELS:
+        merge_model_files(args.MODELS, args.OUTFILE or "model.bglm")
+    else:
+        convert_text_model(args.UNIGRAMS, args.BIGRAMS, args.OUTFILE or "model.bglm")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Lazily loaded spell checkers for many languages.
+
+A ModelRegistry only records where each language's model file is, so it
+starts in constant time however many models are installed. A model is
+loaded on first use and kept while it is among the most recently used
+ones, within max_models and a memory budget; the least recently used ones
+are evicted beyond that. Loading a model file maps it without reading it
+(see model_file.py), so a bigram row is only paged in from disk when a
+sentence touches its first word, and an evicted model's pages go back to
+the page cache. What a loaded model holds in memory is the per-word
+smoothing tables and, once a sentence is corrected, its candidate index,
+which the budget accounts for from then on.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from array import array
+from collections import OrderedDict
+
+from BigramModelSpellCheck import BigramModelSpellCheck
+
+MODEL_SUFFIX = '.bglm'
+
+
+def resident_bytes(model):
+    """Approximate memory held by a loaded model outside its mapped model file (caches excluded)."""
+    total = model.unigrams.nbytes() + model.bigrams.nbytes()
+    for value in vars(model.smoothing).itervalues():
+        if isinstance(value, array):
+            total += value.itemsize * len(value)
+    index = model.candidate_index
+    if index is not None:
+        total += sys.getsizeof(index.keys)
+        for key, ids in index.keys.iteritems():
+            total += sys.getsizeof(key)
+            if isinstance(ids, list):
+                total += sys.getsizeof(ids)
+    return total
+
+
+class ModelRegistry:
+    """
+    Maps languages to model files and hands out loaded models, eg.
+    registry.get("tam").correct_sentence(line). max_models and
+    memory_budget (bytes) bound what stays loaded; the model just asked for
+    is always kept, even alone over budget. make_model(lang) creates the
+    empty BigramModelSpellCheck a file is loaded into, eg. to choose the
+    smoothing.
+    """
+
+    def __init__(self, paths=None, max_models=None, memory_budget=None, make_model=None):
+        self.paths = dict(paths or {})
+        self.max_models = max_models
+        self.memory_budget = memory_budget
+        self.make_model = make_model or (lambda lang: BigramModelSpellCheck(lang=lang))
+        self.models = OrderedDict()     # lang -> (model, resident bytes, candidate index counted), least recently used first
+        self.lock = threading.Lock()
+        self.loading = {}               # lang -> lock held while that model loads
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    @classmethod
+    def from_directory(cls, directory, **options):
+        """Registry of the <lang>.bglm files in directory."""
+        paths = {}
+        for name in os.listdir(directory):
+            if name.endswith(MODEL_SUFFIX):
+                paths[name[:-len(MODEL_SUFFIX)]] = os.path.join(directory, name)
+        return cls(paths, **options)
+
+    def add(self, lang, filename):
+        """Registers (or replaces) the model file of lang; a loaded older model is dropped."""
+        with self.lock:
+            self.paths[lang] = filename
+            self.models.pop(lang, None)
+
+    def languages(self):
+        return sorted(self.paths)
+
+    def get(self, lang):
+        """The loaded model of lang, loading it first if need be."""
+        with self.lock:
+            entry = self.models.pop(lang, None)
+            if entry is not None:
+                model = entry[0]
+                if entry[2] is not model.candidate_index:   # built since it was measured
+                    entry = model, resident_bytes(model), model.candidate_index
+                self.models[lang] = entry       # now the most recently used
+                self._evict()
+                self.hits += 1
+                return model
+            if lang not in self.paths:
+                raise KeyError('no model registered for language %r' % lang)
+            loading = self.loading.setdefault(lang, threading.Lock())
+        with loading:                           # other languages stay available meanwhile
+            with self.lock:
+                entry = self.models.get(lang)
+                if entry is not None:           # loaded by another thread while this one waited
+                    self.hits += 1
+                    return entry[0]
+                filename = self.paths[lang]
+            start = time.time()
+            model = self.make_model(lang)
+            model.load_model(filename)
+            size = resident_bytes(model)
+            with self.lock:
+                self.load_seconds += time.time() - start
+                self.loads += 1
+                if self.paths.get(lang) == filename:    # not replaced by add() meanwhile
+                    self.models[lang] = model, size, model.candidate_index
+                    self._evict()
+            return model
+
+    def _evict(self):
+        while len(self.models) > 1 and (
+                (self.max_models is not None and len(self.models) > self.max_models) or
+                (self.memory_budget is not None and self.resident() > self.memory_budget)):
+            self.models.popitem(last=False)
+            self.evictions += 1
+
+    def resident(self):
+        return sum(entry[1] for entry in self.models.itervalues())
+
+    def evict(self, lang=None):
+        """Unloads lang, or every model."""
+        with self.lock:
+            if lang is None:
+                self.models.clear()
+            else:
+                self.models.pop(lang, None)
+
+    def stats(self):
+        with self.lock:
+            return {'registered': len(self.paths),
+                    'loaded': OrderedDict((lang, entry[1]) for lang, entry in self.models.iteritems()),
+                    'resident_bytes': self.resident(),
+                    'loads': self.loads,
+                    'hits': self.hits,
+                    'evictions': self.evictions,
+                    'load_seconds': self.load_seconds}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="model_registry",
+                                     description="Corrects lines of <lang>\\t<sentence>, loading each language's\n"
+                                                 "model from <directory>/<lang>.bglm on first use",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--d', metavar='directory', dest="DIRECTORY", default=".", help="<model-directory>")
+    parser.add_argument('--i', metavar='input', dest="INFILE", type=argparse.FileType('r'), default=sys.stdin, help="<input-file>")
+    parser.add_argument('--o', metavar='output', dest="OUTFILE", type=argparse.FileType('w'), default=sys.stdout, help="<output-file>")
+    parser.add_argument('--max-models', dest="MAX_MODELS", type=int, default=None, help="models kept loaded at most")
+    parser.add_argument('--budget', dest="BUDGET", type=int, default=None, help="memory budget of the loaded models in MB")
+    args = parser.parse_args()
+
+    registry = ModelRegistry.from_directory(args.DIRECTORY, max_models=args.MAX_MODELS,
+                                            memory_budget=args.BUDGET and args.BUDGET << 20)
+    for number, line in enumerate(args.INFILE, 1):
+        lang, _, sentence = line.rstrip('\n').partition('\t')
+        try:
+            model = registry.get(lang)
+        except KeyError as error:
+            sys.stderr.write('line %d: %s, passed through unchanged\n' % (number, error.args[0]))
+            args.OUTFILE.write('%s\t%s\n' % (lang, sentence))
+            continue
+        args.OUTFILE.write('%s\t%s\n' % (lang, ' '.join(model.correct_sentence(sentence))))
+    stats = registry.stats()
+    sys.stderr.write('%d of %d models loaded (%d bytes), %d loads, %d hits, %d evictions, %.2fs loading\n'
+                     % (len(stats['loaded']), stats['registered'], stats['resident_bytes'], stats['loads'],
+                        stats['hits'], stats['evictions'], stats['load_seconds']))
+    args.INFILE.close()
+    args.OUTFILE.close()
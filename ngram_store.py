@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Compact count tables for the bigram language model.
+
+Every word is interned to an integer id by a Vocabulary, and bigram counts
+are kept in a BigramStore: a CSR layout (one sorted row of second-word ids
+per first word) over packed arrays, with O(log n) lookup of a count.
+"""
+
+from array import array
+from bisect import bisect_left
+from itertools import izip
+
+ID_BITS = 32            # a bigram (a,b) is packed as a<<ID_BITS|b while counting
+ID_MASK = (1 << ID_BITS) - 1
+
+
+class Vocabulary:
+    """Maps words to integer ids and keeps their unigram counts."""
+
+    def __init__(self):
+        self.ids = {}
+        self.words = []
+        self.counts = array('l')
+        self.total = 0
+
+    def add(self, word, count=1):
+        """Adds count occurrences of word, returns its id."""
+        i = self.ids.get(word)
+        if i is None:
+            i = self.ids[word] = len(self.words)
+            self.words.append(word)
+            self.counts.append(count)
+        else:
+            self.counts[i] += count
+        self.total += count
+        return i
+
+    def index(self, word):
+        """Id of word, -1 if it is out of vocabulary."""
+        return self.ids.get(word, -1)
+
+    def word(self, i):
+        return self.words[i]
+
+    def count(self, i):
+        if i < 0:
+            return 0
+        return self.counts[i]
+
+    def get(self, word, default=None):
+        i = self.ids.get(word)
+        if i is None:
+            return default
+        return self.counts[i]
+
+    def __getitem__(self, word):
+        return self.counts[self.ids[word]]
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def iteritems(self):
+        return izip(self.words, self.counts)
+
+    def nbytes(self):
+        """Approximate size of the count array (the word table is shared
+        with the strings themselves)."""
+        return self.counts.itemsize * len(self.counts)
+
+
+class BigramStore:
+    """
+    Bigram counts by word id. New counts are collected in a small dict keyed
+    on packed ids and merged into the sorted CSR arrays by freeze(), which
+    lookups do implicitly.
+    """
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+        self.row_ptr = array('l', [0])  # row a is cols/vals[row_ptr[a]:row_ptr[a+1]]
+        self.cols = array('i')
+        self.vals = array('l')
+        self.row_totals = None          # per row sums with the pruned counts, computed on first use or loaded
+        self.sketch = None              # approximate counts of pruned bigrams, see pruning.py
+        self.pruned = None              # row -> sum of the counts pruned into the sketch
+        self.pending = {}
+
+    def add(self, a, b, count=1):
+        key = a << ID_BITS | b
+        self.pending[key] = self.pending.get(key, 0) + count
+
+    def freeze(self):
+        """Merges pending counts into the CSR arrays."""
+        if not self.pending:
+            return
+        new = sorted(self.pending.iteritems())
+        self.pending = {}
+        row_ptr = array('l', [0])
+        cols = array('i')
+        vals = array('l')
+        row = 0
+        for key, count in self._merge(self._packed_entries(), new):
+            if count <= 0:
+                continue
+            a = key >> ID_BITS
+            while row < a:
+                row_ptr.append(len(cols))
+                row += 1
+            cols.append(key & ID_MASK)
+            vals.append(count)
+        for row in xrange(row, len(self.vocab)):
+            row_ptr.append(len(cols))
+        self.row_ptr, self.cols, self.vals = row_ptr, cols, vals
+        self.row_totals = None
+
+    def _packed_entries(self):
+        row_ptr, cols, vals = self.row_ptr, self.cols, self.vals
+        for a in xrange(len(row_ptr) - 1):
+            for j in xrange(row_ptr[a], row_ptr[a + 1]):
+                yield a << ID_BITS | cols[j], vals[j]
+
+    @staticmethod
+    def _merge(old, new):
+        """Merges two key-sorted (key,count) sequences, summing equal keys."""
+        old = iter(old)
+        new = iter(new)
+        a = next(old, None)
+        b = next(new, None)
+        while a is not None and b is not None:
+            if a[0] < b[0]:
+                yield a
+                a = next(old, None)
+            elif b[0] < a[0]:
+                yield b
+                b = next(new, None)
+            else:
+                yield a[0], a[1] + b[1]
+                a = next(old, None)
+                b = next(new, None)
+        while a is not None:
+            yield a
+            a = next(old, None)
+        while b is not None:
+            yield b
+            b = next(new, None)
+
+    def row(self, a):
+        """(lo,hi) bounds of the row of first word a in cols/vals."""
+        if self.pending:
+            self.freeze()
+        if a < 0 or a + 1 >= len(self.row_ptr):
+            return 0, 0
+        return self.row_ptr[a], self.row_ptr[a + 1]
+
+    def count(self, a, b):
+        """Count of (a,b), estimated by the sketch for a pair of known words missing from the table."""
+        n = self.exact_count(a, b)
+        if n:
+            return n
+        if self.sketch is not None and a >= 0 and b >= 0 and self.vocab.count(a) > 0 and self.vocab.count(b) > 0:
+            return min(self.sketch.get(self.vocab.word(a), self.vocab.word(b)), self.row_total(a))
+        return 0
+
+    def exact_count(self, a, b):
+        lo, hi = self.row(a)
+        j = bisect_left(self.cols, b, lo, hi)
+        if j < hi and self.cols[j] == b:
+            return self.vals[j]
+        return 0
+
+    def __len__(self):
+        if self.pending:
+            self.freeze()
+        return len(self.cols)
+
+    def iteritems(self):
+        """Yields ("first_second",count) in the layout of the old text dump."""
+        if self.pending:
+            self.freeze()
+        word = self.vocab.word
+        row_ptr, cols, vals = self.row_ptr, self.cols, self.vals
+        for a in xrange(len(row_ptr) - 1):
+            first = word(a) + "_"
+            for j in xrange(row_ptr[a], row_ptr[a + 1]):
+                yield first + word(cols[j]), vals[j]
+
+    def row_total(self, a):
+        """
+        Sum of the counts in row a, ie. how often a is followed by a word,
+        including the bigrams pruned into the sketch.
+        """
+        totals = self.totals()
+        return totals[a] if 0 <= a < len(totals) else 0
+
+    def totals(self):
+        """row_total() of every row, as one array."""
+        if self.pending or self.row_totals is None:
+            self.freeze()
+            pruned = self.pruned or {}
+            row_ptr, vals = self.row_ptr, self.vals
+            self.row_totals = array('l', (sum(vals[j] for j in xrange(row_ptr[r], row_ptr[r + 1])) + pruned.get(r, 0)
+                                          for r in xrange(len(row_ptr) - 1)))
+        return self.row_totals
+
+    def add_pruned(self, a, count):
+        """Records count occurrences of row a moved from the table to the sketch."""
+        if self.pruned is None:
+            self.pruned = {}
+        self.pruned[a] = self.pruned.get(a, 0) + count
+        self.row_totals = None
+
+    def nbytes(self):
+        if not isinstance(self.cols, array):
+            return 0    # mapped from a model file
+        return sum(x.itemsize * len(x) for x in (self.row_ptr, self.cols, self.vals))
+
+
+def count_tokens(vocab, store, tokens, k_minus_1, separator_id):
+    """
+    Counts a run of tokens into vocab and store. k_minus_1 is the id of the
+    token before the run; no bigram is counted into the sentence separator.
+    Returns the id of the last token, to continue with the next run.
+    """
+    ids = vocab.ids
+    counts = vocab.counts
+    pending = store.pending
+    for k_word in tokens:
+        k = ids.get(k_word)
+        if k is None:
+            k = vocab.add(k_word, 0)
+        counts[k] += 1
+        if k != separator_id:
+            key = k_minus_1 << ID_BITS | k
+            pending[key] = pending.get(key, 0) + 1
+        k_minus_1 = k
+    vocab.total += len(tokens)
+    return k_minus_1
+
+
+def count_stream(vocab, store, chunks, separator, pruning=None):
+    """
+    Counts a stream of text chunks holding one token per line, sentences
+    ended by separator. Chunks may split a token anywhere; the pieces are
+    joined back. pruning (see pruning.py) may shrink the tables between
+    chunks. Returns the number of tokens counted.
+    """
+    separator_id = vocab.add(separator, 0)
+    k_minus_1 = separator_id
+    no_of_tokens = 0
+    tail = ""
+    for chunk in chunks:
+        head, _, tail = (tail + chunk).rpartition("\n")   # last piece may be a partial token, carried to the next chunk
+        tokens = head.split()
+        no_of_tokens += len(tokens)
+        k_minus_1 = count_tokens(vocab, store, tokens, k_minus_1, separator_id)
+        if pruning is not None:
+            pruning.check(vocab, store)
+    tokens = tail.split()
+    no_of_tokens += len(tokens)
+    count_tokens(vocab, store, tokens, k_minus_1, separator_id)
+    store.freeze()
+    return no_of_tokens
+
+
+def merge_counts(vocab, store, other_vocab, other_store, sign=1):
+    """
+    Adds the counts of other_vocab/other_store, eg. a shard counted in
+    another process or a model built on another day, into vocab/store.
+    Ids are matched by word; new words get the next free ids. With sign=-1
+    the counts are subtracted instead, bigrams falling to zero are dropped
+    and words falling to zero keep their id with a zero count; ValueError
+    is raised, before anything is subtracted, if other_vocab/other_store
+    hold counts that vocab/store do not have. The pruned counts of a store
+    with a sketch go into the row totals of store, the sketch itself is
+    left to the caller.
+    """
+    if sign < 0:
+        check_removal(vocab, store, other_vocab, other_store)
+    remap = array('l', (vocab.add(other_vocab.word(i), sign * other_vocab.count(i)) for i in xrange(len(other_vocab))))
+    cols, vals = other_store.cols, other_store.vals
+    for a in xrange(len(other_vocab)):
+        lo, hi = other_store.row(a)
+        first = remap[a]
+        for j in xrange(lo, hi):
+            store.add(first, remap[cols[j]], sign * vals[j])
+        if other_store.sketch is not None:
+            pruned = other_store.row_total(a) - sum(vals[j] for j in xrange(lo, hi))
+            if pruned:
+                store.add_pruned(first, sign * pruned)
+    store.freeze()
+
+
+def check_removal(vocab, store, other_vocab, other_store):
+    """Raises ValueError unless every count of other_vocab/other_store can be subtracted from vocab/store."""
+    ids = array('l', (vocab.index(other_vocab.word(i)) for i in xrange(len(other_vocab))))
+    for i in xrange(len(other_vocab)):
+        if other_vocab.count(i) > vocab.count(ids[i]):
+            raise ValueError('cannot remove %d occurrences of %r, the model has %d'
+                             % (other_vocab.count(i), other_vocab.word(i), vocab.count(ids[i])))
+    if store.sketch is not None:
+        return      # the counts of pruned bigrams are only estimates, they are dropped at zero instead
+    cols, vals = other_store.cols, other_store.vals
+    for a in xrange(len(other_vocab)):
+        lo, hi = other_store.row(a)
+        for j in xrange(lo, hi):
+            count = store.count(ids[a], ids[cols[j]])
+            if vals[j] > count:
+                raise ValueError('cannot remove %d occurrences of the bigram %r %r, the model has %d'
+                                 % (vals[j], other_vocab.word(a), other_vocab.word(cols[j]), count))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel counting of a tokenised corpus.
+
+The corpus file is cut into byte ranges that start right after a "$$$"
+sentence separator line, each range is counted by count_stream() in its own
+process, and the partial tables are merged by word, all shards in one pass
+(sorted and summed with numpy when it is installed). Every shard starts at
+a sentence boundary, so the result equals a serial build.
+"""
+
+import os
+import multiprocessing
+from array import array
+
+from ngram_store import Vocabulary, BigramStore, count_stream, ID_BITS, ID_MASK
+from vector_scoring import NUMPY, as_numpy
+
+if NUMPY:
+    import numpy
+
+
+def shard_boundaries(filename, shards, separator):
+    """Byte offsets [0, ..., file size] cutting filename into at most shards ranges."""
+    size = os.path.getsize(filename)
+    boundaries = [0]
+    with open(filename, 'rb') as f:
+        for i in xrange(1, shards):
+            f.seek(max(size * i // shards, boundaries[-1]))
+            if f.tell() > 0:
+                f.readline()                    # skip the line the cut fell into
+            while True:
+                line = f.readline()
+                if not line or line.rstrip() == separator:
+                    break
+            if f.tell() > boundaries[-1] and f.tell() < size:
+                boundaries.append(f.tell())
+    boundaries.append(size)
+    return boundaries
+
+
+def _read_range(f, start, end, chunk_size):
+    f.seek(start)
+    left = end - start
+    while left > 0:
+        chunk = f.read(min(chunk_size, left))
+        if not chunk:
+            break
+        left -= len(chunk)
+        yield chunk
+
+
+def count_shard(args):
+    """Counts bytes [start,end) of filename; returns (vocabulary, bigram store, no. of tokens)."""
+    filename, start, end, separator, chunk_size = args
+    vocab = Vocabulary()
+    store = BigramStore(vocab)
+    with open(filename, 'rb') as f:
+        no_of_tokens = count_stream(vocab, store, _read_range(f, start, end, chunk_size), separator)
+    return vocab, store, no_of_tokens
+
+
+def count_parallel(vocab, store, filename, separator, processes=None, chunk_size=1 << 20):
+    """Counts filename into vocab/store over a pool of processes; returns the number of tokens."""
+    processes = processes or multiprocessing.cpu_count()
+    boundaries = shard_boundaries(filename, processes, separator)
+    shards = [(filename, start, end, separator, chunk_size) for start, end in zip(boundaries, boundaries[1:])]
+    pool = multiprocessing.Pool(processes)
+    try:
+        counted = pool.map(count_shard, shards)
+    finally:
+        pool.terminate()
+        pool.join()
+    merge_shards(vocab, store, [(shard_vocab, shard_store) for shard_vocab, shard_store, shard_tokens in counted])
+    return sum(shard_tokens for shard_vocab, shard_store, shard_tokens in counted)
+
+
+def merge_shards(vocab, store, shards):
+    """
+    Adds the counts of the (vocabulary, bigram store) shards into
+    vocab/store. Unlike merge_counts once per shard, which rewrites the
+    whole table after each one, the bigrams of every shard are renumbered
+    and merged at once.
+    """
+    remaps = [array('l', (vocab.add(shard_vocab.word(i), shard_vocab.count(i)) for i in xrange(len(shard_vocab))))
+              for shard_vocab, shard_store in shards]
+    if NUMPY:
+        _merge_sorted(store, [(remap, shard_store) for remap, (shard_vocab, shard_store) in zip(remaps, shards)])
+        return
+    pending = store.pending
+    for remap, (shard_vocab, shard_store) in zip(remaps, shards):
+        row_ptr, cols, vals = shard_store.row_ptr, shard_store.cols, shard_store.vals
+        for a in xrange(len(row_ptr) - 1):
+            first = remap[a] << ID_BITS
+            for j in xrange(row_ptr[a], row_ptr[a + 1]):
+                key = first | remap[cols[j]]
+                pending[key] = pending.get(key, 0) + vals[j]
+    store.freeze()
+
+
+def _packed_keys(store, remap=None):
+    """numpy arrays of the packed keys and the counts of a frozen store, ids renumbered by remap."""
+    row_ptr = as_numpy(store.row_ptr)
+    rows = numpy.repeat(numpy.arange(len(row_ptr) - 1, dtype=numpy.int64), numpy.diff(row_ptr))
+    cols = as_numpy(store.cols).astype(numpy.int64)
+    if remap is not None:
+        remap = as_numpy(remap).astype(numpy.int64)
+        rows, cols = remap[rows], remap[cols]
+    return (rows << ID_BITS) | cols, as_numpy(store.vals).astype(numpy.int64)
+
+
+def _merge_sorted(store, shards):
+    store.freeze()
+    packed = [_packed_keys(store)] + [_packed_keys(shard_store, remap) for remap, shard_store in shards]
+    keys = numpy.concatenate([k for k, v in packed])
+    vals = numpy.concatenate([v for k, v in packed])
+    order = numpy.argsort(keys, kind='mergesort')
+    keys, vals = keys[order], vals[order]
+    if len(keys):
+        starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(keys)) + 1))
+        keys, vals = keys[starts], numpy.add.reduceat(vals, starts)
+    rows = keys >> ID_BITS
+    store.row_ptr = _as_array('l', numpy.searchsorted(rows, numpy.arange(len(store.vocab) + 1)))
+    store.cols = _as_array('i', keys & ID_MASK)
+    store.vals = _as_array('l', vals)
+    store.row_totals = None
+
+
+def _as_array(typecode, values):
+    return array(typecode, values.astype(numpy.dtype(typecode)).tostring())
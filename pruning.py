@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Count pruning and approximate counting for bounded-memory models.
+
+Pruning keeps exact counts only for bigrams seen at least min_count times
+and, optionally, for the max_vocab most frequent words. The counts of the
+pruned bigrams go into a Count-Min Sketch, which BigramStore.count() falls
+back to, so rare bigrams still score above unseen ones. max_bigrams bounds
+the exact table: while counting, whenever it outgrows max_bigrams, it is
+pruned to half of that with the count threshold raised as far as needed,
+and the final model keeps at most max_bigrams (lossy counting: a bigram
+pruned early and frequent later is undercounted by at most what was
+pruned). The table only grows past the bound by the bigrams of one chunk.
+"""
+
+import sys
+import struct
+import hashlib
+import argparse
+from array import array
+from itertools import islice
+
+from ngram_store import Vocabulary, BigramStore
+
+
+class CountMinSketch:
+    """
+    depth rows of width counters; a bigram adds to one counter per row and
+    its Count-Min estimate is the smallest of them, never below the true
+    count as long as counts are only added.
+    Keyed on the words, so it survives the renumbering of a saved model.
+    """
+
+    def __init__(self, width=1 << 16, depth=4, table=None):
+        if depth > 4:
+            raise ValueError('CountMinSketch supports a depth of at most 4')
+        self.width = width
+        self.depth = depth
+        self.table = array('l', [0]) * (width * depth) if table is None else table
+        self.row_sums = None    # per row sum of the counters, for the noise of a counter
+
+    def _cells(self, first, second):
+        hashes = struct.unpack('<4I', hashlib.md5(first + '\0' + second).digest())
+        width = self.width
+        return [row * width + hashes[row] % width for row in xrange(self.depth)]
+
+    def add(self, first, second, count=1):
+        """Conservative update: raises each cell only as far as the new estimate."""
+        table = self.table
+        cells = self._cells(first, second)
+        estimate = min(table[cell] for cell in cells) + count
+        for cell in cells:
+            if table[cell] < estimate:
+                table[cell] = estimate
+        self.row_sums = None
+
+    def get(self, first, second):
+        """
+        Estimated count of a bigram: the median over the rows of its counter
+        less the mean of the other counters of the row, capped by the
+        Count-Min estimate (count-mean-min). A filled sketch then leaves
+        bigrams never added near zero, instead of at the counts of those
+        they collide with, so the estimates of a row of the model add up to
+        about what was pruned from it.
+        """
+        table = self.table
+        cells = self._cells(first, second)
+        estimate = min(table[cell] for cell in cells)
+        if not estimate:
+            return 0
+        width = self.width
+        if self.row_sums is None:
+            counters = iter(table)
+            self.row_sums = [sum(islice(counters, width)) for row in xrange(self.depth)]
+        debiased = sorted(table[cell] - (self.row_sums[cell // width] - table[cell]) / (width - 1.0) for cell in cells)
+        middle = len(debiased) // 2
+        median = debiased[middle] if len(debiased) % 2 else (debiased[middle - 1] + debiased[middle]) / 2.0
+        return max(0, min(estimate, int(round(median))))
+
+    def nbytes(self):
+        if not isinstance(self.table, array):
+            return 0    # mapped from a model file
+        return self.table.itemsize * len(self.table)
+
+
+class Pruning:
+    """
+    Pruning options for BigramModelSpellCheck.build_model. sketch_width=0
+    drops pruned bigrams instead of sketching them.
+    """
+
+    def __init__(self, min_count=2, max_vocab=None, sketch_width=1 << 16, sketch_depth=4, max_bigrams=None):
+        self.min_count = min_count
+        self.max_vocab = max_vocab
+        self.max_bigrams = max_bigrams
+        self.sketch = CountMinSketch(sketch_width, sketch_depth) if sketch_width else None
+
+    def check(self, vocab, store):
+        """
+        Called while counting; prunes the bigram table to half of
+        max_bigrams when it is over, so the next chunks are counted
+        before it has to be pruned again.
+        """
+        if self.max_bigrams is not None and len(store.pending) + len(store.cols) > self.max_bigrams:
+            self.prune_bigrams(vocab, store, self.max_bigrams // 2)
+
+    def prune(self, vocab, store, keep=()):
+        """
+        Final pruning: caps the vocabulary, prunes the bigrams and returns
+        a compacted (vocabulary, bigram store) holding the words left, as
+        a saved model would. Words in keep are never dropped.
+        """
+        if self.max_vocab is not None and len(vocab) > self.max_vocab:
+            ranked = sorted(xrange(len(vocab)), key=vocab.count, reverse=True)
+            for i in ranked[self.max_vocab:]:
+                if vocab.word(i) not in keep:
+                    vocab.counts[i] = 0
+        self.prune_bigrams(vocab, store, self.max_bigrams)
+        return compact(vocab, store, keep)
+
+    def prune_bigrams(self, vocab, store, limit=None):
+        """
+        Prunes the bigrams seen fewer than min_count times and those of
+        words with a zero count. With limit, the threshold is raised above
+        min_count as far as needed to keep at most limit bigrams.
+        """
+        store.freeze()
+        threshold = self.min_count
+        if limit is not None:
+            threshold = max(threshold, count_threshold(store.vals, limit))
+        word, count = vocab.word, vocab.count
+        sketch = self.sketch
+        row_ptr, cols, vals = store.row_ptr, store.cols, store.vals
+        pruned = []
+        for a in xrange(len(row_ptr) - 1):
+            for j in xrange(row_ptr[a], row_ptr[a + 1]):
+                b, n = cols[j], vals[j]
+                if n < threshold or count(a) <= 0 or count(b) <= 0:
+                    if sketch is not None and count(a) > 0 and count(b) > 0:
+                        sketch.add(word(a), word(b), n)
+                        store.add_pruned(a, n)      # still part of the history of a
+                    pruned.append((a, b, n))
+        for a, b, n in pruned:
+            store.add(a, b, -n)
+        store.freeze()
+        store.sketch = sketch
+
+
+def count_threshold(vals, limit):
+    """Smallest count t such that at most limit of the counts vals are t or more."""
+    histogram = {}
+    for n in vals:
+        histogram[n] = histogram.get(n, 0) + 1
+    kept = 0
+    for n in sorted(histogram, reverse=True):
+        kept += histogram[n]
+        if kept > limit:
+            return n + 1
+    return 0
+
+
+def compact(vocab, store, keep=()):
+    """Copy of vocab/store without the words whose count is zero, other than those in keep."""
+    new_vocab = Vocabulary()
+    new_store = BigramStore(new_vocab)
+    remap = array('l', [-1]) * len(vocab)
+    for i in xrange(len(vocab)):
+        if vocab.count(i) > 0 or vocab.word(i) in keep:
+            remap[i] = new_vocab.add(vocab.word(i), vocab.count(i))
+    new_vocab.total = vocab.total
+    store.freeze()
+    cols, vals = store.cols, store.vals
+    for a in xrange(len(vocab)):
+        if remap[a] < 0:
+            continue
+        lo, hi = store.row(a)
+        for j in xrange(lo, hi):
+            if remap[cols[j]] >= 0:
+                new_store.add(remap[a], remap[cols[j]], vals[j])
+        if store.pruned and a in store.pruned:
+            new_store.add_pruned(remap[a], store.pruned[a])
+    new_store.freeze()
+    new_store.sketch = store.sketch
+    return new_vocab, new_store
+
+
+def footprint(model):
+    """Approximate resident bytes of a model's count tables, by part."""
+    vocab = model.unigrams
+    words = 0
+    if hasattr(vocab, 'ids'):
+        words = sum(sys.getsizeof(w) for w in vocab.words) + sys.getsizeof(vocab.ids)
+    sketch = model.bigrams.sketch
+    return {'vocabulary': vocab.nbytes() + words,
+            'bigrams': model.bigrams.nbytes(),
+            'sketch': sketch.nbytes() if sketch is not None else 0}
+
+
+def accuracy_delta(exact, approx, sentences):
+    """
+    Compares two models on tokenised sentences (lists of utf-8 tokens):
+    mean and max absolute difference of the sentence log likelihoods, and
+    the share of sentences corrected the same way.
+    """
+    deltas = []
+    same = 0
+    for tokens in sentences:
+        exact_ids = [exact.unigrams.index(token) for token in tokens]
+        approx_ids = [approx.unigrams.index(token) for token in tokens]
+        deltas.append(abs(exact.ids_log_likelihood(exact_ids) - approx.ids_log_likelihood(approx_ids)))
+        same += exact.correct_tokens(tokens) == approx.correct_tokens(tokens)
+    if not deltas:
+        return {'mean_abs_log_likelihood_delta': 0.0, 'max_abs_log_likelihood_delta': 0.0, 'same_correction': 1.0}
+    return {'mean_abs_log_likelihood_delta': sum(deltas) / len(deltas),
+            'max_abs_log_likelihood_delta': max(deltas),
+            'same_correction': same / float(len(deltas))}
+
+
+if __name__ == '__main__':
+    from BigramModelSpellCheck import BigramModelSpellCheck
+
+    parser = argparse.ArgumentParser(prog="pruning",
+                                     description="Builds a pruned model and reports its size and accuracy against the exact one")
+    parser.add_argument('--t', metavar='tokenised', dest="TOKENISED", default="corpus_tokenised.txt", help="<tokenised-corpus>")
+    parser.add_argument('--i', metavar='input', dest="INFILE", type=argparse.FileType('r'), help="<sentences> to measure accuracy on, one per line")
+    parser.add_argument('--o', metavar='output', dest="OUTFILE", default="model_pruned.bglm", help="<model-file>")
+    parser.add_argument('--min-count', dest="MIN_COUNT", type=int, default=2)
+    parser.add_argument('--max-vocab', dest="MAX_VOCAB", type=int, default=None)
+    parser.add_argument('--max-bigrams', dest="MAX_BIGRAMS", type=int, default=None)
+    parser.add_argument('--sketch-width', dest="SKETCH_WIDTH", type=int, default=1 << 16, help="0 to drop pruned bigrams")
+    args = parser.parse_args()
+
+    exact = BigramModelSpellCheck()
+    exact.build_model(open(args.TOKENISED, 'rb'))
+    approx = BigramModelSpellCheck()
+    approx.build_model(open(args.TOKENISED, 'rb'),
+                       Pruning(args.MIN_COUNT, args.MAX_VOCAB, args.SKETCH_WIDTH, max_bigrams=args.MAX_BIGRAMS))
+    approx.save_model(args.OUTFILE)
+    for name, model in (('exact', exact), ('pruned', approx)):
+        parts = footprint(model)
+        print '%s\t%d bytes\t%s' % (name, sum(parts.values()), ' '.join('%s=%d' % item for item in sorted(parts.items())))
+    if args.INFILE:
+        sentences = [exact.sentence_tokens(line) for line in args.INFILE]
+        for item in sorted(accuracy_delta(exact, approx, sentences).items()):
+            print '%s\t%.6f' % item
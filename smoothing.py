@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Smoothing methods for the bigram model, all scoring in log space.
+
+Each method precomputes its per-word terms (denominators, backoff weights)
+in prepare(), called whenever the model is built or loaded, so log_prob()
+is a count lookup plus a few additions. With numpy installed, prepare()
+computes them with whole-array arithmetic over views of the count tables,
+which for a loaded model are the mapped file itself; the results are the
+same. Word ids are those of the model's vocabulary, -1 standing for an
+unknown word.
+"""
+
+import math
+from array import array
+
+NUMPY = True
+
+try:
+    import numpy
+except ImportError:
+    NUMPY = False
+
+log = math.log
+
+
+def vocabulary_size(unigrams):
+    """
+    V, the number of words with a count. A word whose text was taken out
+    of the model again keeps its id with a zero count (see update_model);
+    it is not counted, and scores as an unknown word does.
+    """
+    if NUMPY:
+        return int(numpy.count_nonzero(_view(unigrams.counts) > 0))
+    return sum(1 for count in unigrams.counts if count > 0)
+
+
+def _view(values):
+    from vector_scoring import as_numpy     # vector_scoring imports this module
+    return as_numpy(values)
+
+
+def _array(values):
+    return array('d', values.astype(numpy.float64).tostring())
+
+
+def _rows(bigrams, V):
+    """numpy arrays of the length, the sum of the counts and the total of each of the V rows."""
+    totals = numpy.zeros(V, numpy.int64)
+    row_totals = _view(bigrams.totals())[:V]
+    totals[:len(row_totals)] = row_totals
+    row_ptr = _view(bigrams.row_ptr)[:V + 1]
+    cumulative = numpy.concatenate(([0], numpy.cumsum(_view(bigrams.vals), dtype=numpy.int64)))
+    lengths = numpy.zeros(V, numpy.int64)
+    sums = numpy.zeros(V, numpy.int64)
+    lengths[:len(row_ptr) - 1] = numpy.diff(row_ptr)
+    sums[:len(row_ptr) - 1] = cumulative[row_ptr[1:]] - cumulative[row_ptr[:-1]]
+    return lengths, sums, totals
+
+
+class AddK:
+    """P(b|a) = (c(a,b)+k) / (c(a)+k*V); k=1 is the add one smoothing."""
+
+    sketched = True     # c(a,b) of a pruned bigram is its sketch estimate
+
+    def __init__(self, k=1.0):
+        self.k = float(k)
+
+    def prepare(self, unigrams, bigrams):
+        self.bigrams = bigrams
+        kV = self.k * vocabulary_size(unigrams)
+        if NUMPY:
+            self.log_denominators = _array(numpy.log(_view(unigrams.counts) + kV))
+        else:
+            self.log_denominators = array('d', (log(unigrams.count(i) + kV) for i in xrange(len(unigrams))))
+        self.log_unknown_denominator = log(kV)
+        self.log_k = log(self.k)
+
+    def log_prob(self, a, b):
+        if a < 0:
+            return self.log_k - self.log_unknown_denominator
+        n = self.bigrams.count(a, b)
+        if n:
+            return log(n + self.k) - self.log_denominators[a]
+        return self.log_k - self.log_denominators[a]
+
+
+class KneserNey:
+    """
+    Interpolated Kneser-Ney with absolute discount d. The lower order is the
+    continuation probability of b, itself add one smoothed over the
+    vocabulary so unseen words keep a non-zero score. Bigrams pruned into
+    a sketch back off: their counts add to the backoff weight of their
+    history instead of being estimated one by one, which keeps P(.|a) a
+    distribution.
+    """
+
+    sketched = False
+
+    def __init__(self, d=0.75):
+        self.d = d
+
+    def prepare(self, unigrams, bigrams):
+        self.bigrams = bigrams
+        V = len(unigrams)
+        types = len(bigrams)
+        live = vocabulary_size(unigrams)
+        self.p_unknown = 1.0 / (types + live)
+        if NUMPY:
+            self.prepare_numpy(bigrams, V, types + live)
+            return
+        left_contexts = array('l', [0]) * V                 # N1+(. b)
+        for b in bigrams.cols:
+            left_contexts[b] += 1
+        self.p_continuation = array('d', ((n + 1.0) / (types + live) for n in left_contexts))
+        self.inverse_history = array('d', [0.0]) * V        # 1/c(a.)
+        self.backoff = array('d', [1.0]) * V                # d*N1+(a .)/c(a.)
+        vals = bigrams.vals
+        for a in xrange(V):
+            history = bigrams.row_total(a)
+            if history:
+                lo, hi = bigrams.row(a)
+                pruned = history - sum(vals[j] for j in xrange(lo, hi)) if bigrams.sketch is not None else 0
+                self.inverse_history[a] = 1.0 / history
+                self.backoff[a] = (self.d * (hi - lo) + pruned) / history
+
+    def prepare_numpy(self, bigrams, V, types):
+        left_contexts = numpy.bincount(_view(bigrams.cols), minlength=V)[:V]
+        self.p_continuation = _array((left_contexts + 1.0) / types)
+        lengths, sums, history = _rows(bigrams, V)
+        pruned = history - sums if bigrams.sketch is not None else numpy.zeros(V, numpy.int64)
+        seen = history > 0
+        inverse_history = numpy.zeros(V)
+        backoff = numpy.ones(V)
+        inverse_history[seen] = 1.0 / history[seen]
+        backoff[seen] = (self.d * lengths[seen] + pruned[seen]) / history[seen]
+        self.inverse_history = _array(inverse_history)
+        self.backoff = _array(backoff)
+
+    def log_prob(self, a, b):
+        p_lower = self.p_continuation[b] if b >= 0 else self.p_unknown
+        if a < 0:
+            return log(p_lower)
+        n = self.bigrams.exact_count(a, b)
+        return log(max(n - self.d, 0) * self.inverse_history[a] + self.backoff[a] * p_lower)
+
+
+class StupidBackoff:
+    """
+    Stupid backoff: c(a,b)/c(a.) for a seen bigram, else alpha times the add
+    one unigram probability of b. Scores are not normalised.
+    """
+
+    sketched = True
+
+    def __init__(self, alpha=0.4):
+        self.alpha = alpha
+
+    def prepare(self, unigrams, bigrams):
+        self.bigrams = bigrams
+        V = len(unigrams)
+        norm = float(unigrams.total + vocabulary_size(unigrams))
+        log_alpha = log(self.alpha)
+        self.log_backoff_unknown = log_alpha - log(norm)
+        if NUMPY:
+            history = _rows(bigrams, V)[2]
+            seen = history > 0
+            log_history = numpy.zeros(V)
+            log_history[seen] = numpy.log(history[seen])
+            self.log_history = _array(log_history)
+            self.log_backoff = _array(log_alpha + numpy.log((_view(unigrams.counts) + 1) / norm))
+            return
+        self.log_history = array('d', [0.0]) * V
+        for a in xrange(V):
+            history = bigrams.row_total(a)
+            if history:
+                self.log_history[a] = log(history)
+        self.log_backoff = array('d', (log_alpha + log((unigrams.count(b) + 1) / norm) for b in xrange(V)))
+
+    def log_prob(self, a, b):
+        n = self.bigrams.count(a, b)
+        if n:
+            return log(n) - self.log_history[a]
+        if b < 0:
+            return self.log_backoff_unknown
+        return self.log_backoff[b]
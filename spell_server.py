@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTTP spell checking service over BigramModelSpellCheck.
+
+Connections are served by threads (SocketServer.ThreadingMixIn, this code
+base being Python 2 there is no asyncio), while the CPU-heavy work, ie.
+candidate ranking and correction, runs in a pool of worker processes forked
+with the model, as in batch_check.py. The model is loaded once per
+generation. Every endpoint takes one sentence or a batch of them, and
+answers with one result per sentence:
+
+    POST /check    {"sentence": s} or {"sentences": [s, ...]}, optional
+                   "threshold" and "k"; the suspect words of each sentence
+                   with up to k suggestions as [word, log likelihood]
+    POST /correct  optional "threshold" and "beam"; corrected sentences
+    POST /score    sentence log likelihoods
+    POST /reload   {"model": path}, default the current model file
+    GET  /status   model file, generation and requests in flight
+
+Malformed requests are answered with 400 and {"error": ...}, failures in
+the workers with 500.
+
+A reload loads the new model and forks a new pool before swapping both in
+at once. Requests that started on the old generation finish on it, and its
+pool is closed when the last of them is done, so no request is dropped.
+"""
+
+import sys
+import json
+import urllib2
+import argparse
+import threading
+import multiprocessing
+from SocketServer import ThreadingMixIn
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+from BigramModelSpellCheck import BigramModelSpellCheck
+
+_model = None   # set before a pool forks, read by its workers
+
+
+def _check(args):
+    sentence, threshold, k = args
+    tokens = _model.sentence_tokens(sentence)
+    ids = [_model.unigrams.index(token) for token in tokens]
+    suspects = []
+    for at in xrange(len(tokens)):
+        if _model.is_suspect(ids, at, threshold):
+            suspects.append({'index': at,
+                             'word': tokens[at],
+                             'suggestions': _model.rank_edits(tokens, ids, at, k)})
+    return suspects
+
+
+def _correct(args):
+    sentence, threshold, beam = args
+    return ' '.join(_model.correct_sentence(sentence, threshold, beam))
+
+
+def _score(args):
+    sentence, = args
+    index = _model.unigrams.index
+    return _model.ids_log_likelihood([index(token) for token in _model.sentence_tokens(sentence)])
+
+
+def _sentences(request):
+    """The sentences of a request body, a 400 (ValueError) unless they are strings."""
+    if not isinstance(request, dict):
+        raise ValueError('the request body must be a JSON object')
+    if 'sentences' in request:
+        sentences = request['sentences']
+        if not isinstance(sentences, list) or not all(isinstance(sentence, basestring) for sentence in sentences):
+            raise ValueError('"sentences" must be a list of strings')
+        return sentences
+    if 'sentence' in request:
+        if not isinstance(request['sentence'], basestring):
+            raise ValueError('"sentence" must be a string')
+        return [request['sentence']]
+    raise ValueError('"sentence" or "sentences" is required')
+
+
+def _option(request, name, default, minimum=1):
+    """An integer option of a request body, at least minimum."""
+    value = request.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, long)) or value < minimum:
+        raise ValueError('"%s" must be an integer of at least %d' % (name, minimum))
+    return value
+
+
+def _threshold(request):
+    threshold = request.get('threshold')
+    if threshold is not None and (isinstance(threshold, bool) or not isinstance(threshold, (int, long, float))):
+        raise ValueError('"threshold" must be a number')
+    return threshold
+
+
+class Generation:
+    """A loaded model with the pool forked from it, and the requests using them."""
+
+    def __init__(self, number, model_file, model, pool):
+        self.number = number
+        self.model_file = model_file
+        self.model = model
+        self.pool = pool
+        self.users = 0
+        self.retired = False
+
+
+class SpellCheckServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, model_file, processes=None, chunksize=16, smoothing=None):
+        HTTPServer.__init__(self, address, SpellCheckHandler)
+        self.processes = processes
+        self.chunksize = chunksize
+        self.smoothing = smoothing
+        self.lock = threading.Lock()            # guards generation and the user counts
+        self.reload_lock = threading.Lock()     # one reload at a time
+        self.generation = None
+        self.reload(model_file)
+
+    def reload(self, model_file=None):
+        """Loads model_file (default: the current one) and swaps it in; returns the new generation number."""
+        global _model
+        with self.reload_lock:
+            old = self.generation
+            model_file = model_file or old.model_file
+            model = BigramModelSpellCheck(self.smoothing)
+            model.load_model(model_file)
+            model.build_candidate_index()   # before the pool forks, and while the old generation still serves
+            _model = model
+            new = Generation(old.number + 1 if old else 1, model_file, model, multiprocessing.Pool(self.processes))
+            with self.lock:
+                self.generation = new
+                if old is not None:
+                    old.retired = True
+                    idle = not old.users
+            if old is not None and idle:
+                self._close(old)
+            return new.number
+
+    def acquire(self):
+        with self.lock:
+            generation = self.generation
+            generation.users += 1
+            return generation
+
+    def release(self, generation):
+        with self.lock:
+            generation.users -= 1
+            idle = generation.retired and not generation.users
+        if idle:
+            self._close(generation)
+
+    def _close(self, generation):
+        generation.pool.close()
+        generation.pool.join()
+
+    def run(self, func, args):
+        """Maps func over args on the current generation's pool."""
+        generation = self.acquire()
+        try:
+            return generation.pool.map(func, args, self.chunksize)
+        finally:
+            self.release(generation)
+
+    def status(self):
+        with self.lock:
+            generation = self.generation
+            return {'model': generation.model_file,
+                    'generation': generation.number,
+                    'in_flight': generation.users}
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        with self.lock:
+            generation = self.generation
+        generation.pool.terminate()
+        generation.pool.join()
+
+
+class SpellCheckHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._reply(200, self.server.status())
+        else:
+            self._reply(404, {'error': 'unknown endpoint %s' % self.path})
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.getheader('content-length', 0))) or '{}')
+            if self.path == '/reload':
+                model_file = request.get('model') if isinstance(request, dict) else None
+                if model_file is not None and not isinstance(model_file, basestring):
+                    raise ValueError('"model" must be a string')
+                self._reply(200, {'generation': self.server.reload(model_file)})
+                return
+            sentences = _sentences(request)
+            threshold = _threshold(request)
+            if self.path == '/check':
+                func, args = _check, [(sentence, threshold, _option(request, 'k', 5)) for sentence in sentences]
+            elif self.path == '/correct':
+                func, args = _correct, [(sentence, threshold, _option(request, 'beam', 8)) for sentence in sentences]
+            elif self.path == '/score':
+                func, args = _score, [(sentence,) for sentence in sentences]
+            else:
+                self._reply(404, {'error': 'unknown endpoint %s' % self.path})
+                return
+        except (ValueError, TypeError, KeyError, IOError) as e:
+            self._reply(400, {'error': str(e)})
+            return
+        try:
+            results = self.server.run(func, args)
+        except Exception as e:      # raised in a worker: the request was valid, answer rather than drop the connection
+            self._reply(500, {'error': '%s: %s' % (e.__class__.__name__, e)})
+            return
+        self._reply(200, {'results': results})
+
+    def _reply(self, code, body):
+        body = json.dumps(body)
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SpellCheckClient:
+    """Stand-in client for the service, eg. for local testing."""
+
+    def __init__(self, url='http://localhost:8765'):
+        self.url = url.rstrip('/')
+
+    def _post(self, path, body):
+        return json.loads(urllib2.urlopen(self.url + path, json.dumps(body)).read())
+
+    def check(self, sentences, threshold=None, k=5):
+        return self._post('/check', {'sentences': sentences, 'threshold': threshold, 'k': k})['results']
+
+    def correct(self, sentences, threshold=None, beam=8):
+        return self._post('/correct', {'sentences': sentences, 'threshold': threshold, 'beam': beam})['results']
+
+    def score(self, sentences):
+        return self._post('/score', {'sentences': sentences})['results']
+
+    def reload(self, model_file=None):
+        return self._post('/reload', {'model': model_file})['generation']
+
+    def status(self):
+        return json.loads(urllib2.urlopen(self.url + '/status').read())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="spell_server",
+                                     description="Serves check/correct/score over HTTP, or with --client corrects\n"
+                                                 "one sentence per line through a running server",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--m', metavar='model', dest="MODEL", default="model.bglm", help="<model-file>")
+    parser.add_argument('--host', dest="HOST", default="localhost")
+    parser.add_argument('--port', dest="PORT", type=int, default=8765)
+    parser.add_argument('--p', metavar='processes', dest="PROCESSES", type=int, default=multiprocessing.cpu_count(), help="number of worker processes")
+    parser.add_argument('--client', metavar='url', dest="CLIENT", help="<server-url> to send --i to instead of serving")
+    parser.add_argument('--i', metavar='input', dest="INFILE", type=argparse.FileType('r'), default=sys.stdin, help="<input-file> for --client")
+    args = parser.parse_args()
+
+    if args.CLIENT:
+        for corrected in SpellCheckClient(args.CLIENT).correct([line.decode('utf-8') for line in args.INFILE]):
+            print corrected.encode('utf-8')
+    else:
+        server = SpellCheckServer((args.HOST, args.PORT), args.MODEL, args.PROCESSES)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+The candidate index must return exactly the vocabulary words within two
+edits of a query, ie. what pruning edits2 to the vocabulary returns.
+"""
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ngram_store import Vocabulary
+from candidate_index import CandidateIndex
+from edit_rules import get_edit_rules, BLOCKS, LANGUAGE_SCRIPTS
+
+
+def random_vocabulary(rng, rules, lang, size=1500):
+    if lang == 'urd':
+        letters = [unichr(c) for c in xrange(0x0620, 0x064B)]
+    else:
+        base = BLOCKS[LANGUAGE_SCRIPTS[lang]]
+        letters = [unichr(base + offset) for offset in xrange(0x15, 0x3A)]
+    letters += sorted(rules.replaceable)
+    vocab = Vocabulary()
+    while len(vocab) < size:
+        vocab.add(u''.join(rng.choice(letters) for _ in xrange(rng.randint(1, 5))).encode('utf-8'))
+    return vocab
+
+
+class CandidateIndexTest(unittest.TestCase):
+
+    def assertExact(self, index, rules, word):
+        expected = set(edited.encode('utf-8') for edited in rules.edits2(word.decode('utf-8')))
+        expected = sorted(edited for edited in expected if edited in index.vocab)
+        self.assertEqual(sorted(index.candidates(word)), expected, word)
+
+    def test_same_as_edits2(self):
+        rng = random.Random(0)
+        for lang in ('hin', 'ben', 'pan', 'tam', 'mal', 'urd'):
+            rules = get_edit_rules(lang)
+            index = CandidateIndex(random_vocabulary(rng, rules, lang), rules=rules)
+            words = list(index.vocab)
+            for _ in xrange(100):
+                word = rng.choice(words).decode('utf-8')
+                self.assertExact(index, rules, rng.choice(sorted(rules.edits1(word))).encode('utf-8'))
+
+    def test_words_more_than_two_edits_away(self):
+        rules = get_edit_rules('hin')
+        vocab = Vocabulary()
+        for word in u'अब में मैं मो बं'.split():
+            vocab.add(word.encode('utf-8'))
+        index = CandidateIndex(vocab, rules=rules)
+        for query, far in ((u'बं', u'अब'), (u'मै', u'में'), (u'मो', u'में')):
+            self.assertNotIn(far.encode('utf-8'), index.candidates(query.encode('utf-8')))
+            self.assertExact(index, rules, query.encode('utf-8'))
+
+
+if __name__ == '__main__':
+    unittest.main()
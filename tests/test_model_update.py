@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental updates of a model: update_model, merge_model and the model
+file tool must leave the same counts and spelling candidates as building
+the model from scratch on the same text.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BigramModelSpellCheck import BigramModelSpellCheck
+from smoothing import AddK, KneserNey, StupidBackoff
+from pruning import Pruning
+from model_file import update_model_file
+
+MODEL_FILE_TOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_file.py')
+
+FIRST = u'मैं\nघर\nजा\nरहा\nहूँ\n$$$\nवह\nपेड़\nके\nपास\nहै\n$$$\nघर\nमें\nपानी\nहै\n$$$\n'.encode('utf-8')
+SECOND = u'पे\nपानी\nमें\nहै\n$$$\nमैं\nपी\nरहा\nहूँ\n$$$\nमो\nके\nपास\n$$$\n'.encode('utf-8')
+QUERIES = [word.encode('utf-8') for word in u'पि पे पी मै मैं मो में घर पेड पानि हे'.split()]
+SENTENCES = (FIRST + SECOND).decode('utf-8').split(u'\n$$$\n')[:-1] + [u'पे\nपी\nमो\nके\nघर']
+
+
+def built(*texts, **options):
+    bm = BigramModelSpellCheck()
+    bm.build_model(list(texts))
+    if options.get('index', True):
+        bm.build_candidate_index()      # otherwise built on first use,from the counts of then
+    return bm
+
+
+class ModelTestCase(unittest.TestCase):
+
+    def assertSameModel(self, bm, expected):
+        self.assertEqual(dict((word, count) for word, count in bm.unigrams.iteritems() if count > 0),
+                         dict(expected.unigrams.iteritems()))
+        self.assertEqual(dict(bm.bigrams.iteritems()), dict(expected.bigrams.iteritems()))
+        for word in QUERIES + list(expected.unigrams):
+            self.assertEqual(sorted(bm.candidate_words(word)), sorted(expected.candidate_words(word)), word)
+        smoothing = bm.smoothing
+        for other in (AddK, KneserNey, StupidBackoff, smoothing.__class__):
+            for model in (bm, expected):
+                model.smoothing = other()
+                model.smoothing.prepare(model.unigrams, model.bigrams)
+                model.clear_caches()
+            for sentence in SENTENCES:
+                self.assertAlmostEqual(bm.sentence_log_likelihood(sentence), expected.sentence_log_likelihood(sentence),
+                                       places=9, msg='%s: %s' % (other.__name__, sentence))
+
+
+class UpdateModelTest(ModelTestCase):
+
+    def test_update(self):
+        bm = built(FIRST)
+        bm.update_model([SECOND])
+        self.assertSameModel(bm, built(FIRST, SECOND))
+
+    def test_words_removed_and_added_again(self):
+        for index in (True, False):
+            bm = built(FIRST, index=index)
+            bm.update_model([SECOND])
+            bm.update_model([SECOND], remove=True)
+            self.assertSameModel(bm, built(FIRST))
+            bm.update_model([SECOND])
+            self.assertSameModel(bm, built(FIRST, SECOND))
+
+    def test_removed_before_indexing(self):
+        bm = built(FIRST, index=False)
+        bm.update_model([SECOND])
+        bm.update_model([SECOND], remove=True)
+        self.assertEqual(bm.candidate_index, None)
+        self.assertSameModel(bm, built(FIRST))
+
+    def test_remove_unseen_words(self):
+        bm = built(u'क\nख\n$$$\n'.encode('utf-8'))
+        expected = built(u'क\nख\n$$$\n'.encode('utf-8'))
+        self.assertRaises(ValueError, bm.update_model, [u'ग\n'.encode('utf-8') * 20 + '$$$\n'], remove=True)
+        self.assertSameModel(bm, expected)
+        self.assertTrue(bm.sentence_log_likelihood(u'क\nख') < 0)
+
+    def test_remove_more_than_added(self):
+        bm = built(FIRST)
+        bm.update_model([SECOND])
+        self.assertRaises(ValueError, bm.update_model, [SECOND + SECOND], remove=True)
+        self.assertRaises(ValueError, bm.update_model, [u'मैं\nपानी\n$$$\n'.encode('utf-8')], remove=True)  # known words,unseen bigram
+        self.assertSameModel(bm, built(FIRST, SECOND))
+
+    def test_merge_into_loaded_model(self):
+        directory = tempfile.mkdtemp(prefix='bigram_test')
+        try:
+            model = os.path.join(directory, 'hin.bglm')
+            built(FIRST).save_model(model)
+            bm = BigramModelSpellCheck()
+            bm.load_model(model)
+            self.assertEqual(bm.candidate_index, None)     # built on first use,not on every load
+            bm.merge_model(built(SECOND))
+            self.assertSameModel(bm, built(FIRST, SECOND))
+            bm.load_model(model)
+            bm.update_model([SECOND])
+            self.assertSameModel(bm, built(FIRST, SECOND))
+        finally:
+            shutil.rmtree(directory)
+
+
+class UpdateModelFileTest(ModelTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='bigram_test')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name, text=None):
+        path = os.path.join(self.directory, name)
+        if text is not None:
+            with open(path, 'wb') as fp:
+                fp.write(text)
+        return path
+
+    def test_update_in_place(self):
+        model = self.path('hin.bglm')
+        built(FIRST).save_model(model)
+        subprocess.check_call([sys.executable, MODEL_FILE_TOOL, '--update', model, '--add', self.path('new.txt', SECOND)],
+                              cwd=self.directory)
+        self.assertFalse(os.path.exists(self.path('model.bglm')))
+        bm = BigramModelSpellCheck()
+        bm.load_model(model)
+        self.assertSameModel(bm, built(FIRST, SECOND))
+
+    def test_update_to_another_file(self):
+        model = self.path('hin.bglm')
+        built(FIRST).save_model(model)
+        subprocess.check_call([sys.executable, MODEL_FILE_TOOL, '--update', model, '--add', self.path('new.txt', SECOND),
+                               '--o', self.path('updated.bglm')], cwd=self.directory)
+        bm = BigramModelSpellCheck()
+        bm.load_model(model)
+        self.assertSameModel(bm, built(FIRST))
+        bm.load_model(self.path('updated.bglm'))
+        self.assertSameModel(bm, built(FIRST, SECOND))
+
+    def test_remove(self):
+        model = self.path('hin.bglm')
+        built(FIRST).save_model(self.path('first.bglm'))
+        built(FIRST, SECOND).save_model(model)
+        subprocess.check_call([sys.executable, MODEL_FILE_TOOL, '--update', model, '--remove', self.path('new.txt', SECOND)],
+                              cwd=self.directory)
+        with open(model, 'rb') as fp, open(self.path('first.bglm'), 'rb') as first:
+            self.assertEqual(fp.read(), first.read())
+
+    def test_remove_unseen_text(self):
+        model = self.path('hin.bglm')
+        built(FIRST).save_model(model)
+        with open(model, 'rb') as fp:
+            saved = fp.read()
+        for text in (SECOND, u'मैं\nपानी\n$$$\n'.encode('utf-8')):
+            self.assertRaises(ValueError, update_model_file, model, removed=[self.path('new.txt', text)])
+            with open(model, 'rb') as fp:
+                self.assertEqual(fp.read(), saved)
+        self.assertEqual(os.listdir(self.directory), ['hin.bglm', 'new.txt'])
+
+    def test_same_as_update_model(self):
+        for pruning in (None, Pruning(min_count=2)):
+            model = self.path('hin.bglm')
+            bm = BigramModelSpellCheck()
+            bm.build_model([FIRST], pruning)
+            bm.save_model(model)
+            for added, removed in (([SECOND], []), ([SECOND, FIRST], [SECOND])):
+                update_model_file(model, [self.path('added%d.txt' % i, text) for i, text in enumerate(added)],
+                                  [self.path('removed.txt', text) for text in removed], self.path('updated.bglm'))
+                bm.load_model(model)
+                bm.update_model(added)
+                if removed:
+                    bm.update_model(removed, remove=True)
+                bm.save_model(self.path('expected.bglm'))
+                with open(self.path('updated.bglm'), 'rb') as fp, open(self.path('expected.bglm'), 'rb') as expected:
+                    self.assertEqual(fp.read(), expected.read(), (pruning, len(added), len(removed)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Building a model in parallel must count exactly what the serial build
+counts, whichever way the shards are merged.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parallel_build
+from BigramModelSpellCheck import BigramModelSpellCheck
+from benchmark import write_corpus
+
+
+class ParallelBuildTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='bigram_test')
+        cls.raw, cls.tokenised = write_corpus(cls.directory, seed=2, sentences=2000, vocab=500)
+        cls.serial = BigramModelSpellCheck()
+        with open(cls.tokenised, 'rb') as fp:
+            cls.serial.build_model(fp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def assertSameCounts(self, processes):
+        bm = BigramModelSpellCheck()
+        bm.build_model_parallel(processes, self.tokenised)
+        self.assertEqual(dict(bm.unigrams.iteritems()), dict(self.serial.unigrams.iteritems()))
+        self.assertEqual(dict(bm.bigrams.iteritems()), dict(self.serial.bigrams.iteritems()))
+
+    def test_same_as_serial(self):
+        for processes in (1, 3):
+            self.assertSameCounts(processes)
+
+    def test_same_without_numpy(self):
+        numpy = parallel_build.NUMPY
+        parallel_build.NUMPY = False
+        try:
+            self.assertSameCounts(3)
+        finally:
+            parallel_build.NUMPY = numpy
+
+
+if __name__ == '__main__':
+    unittest.main()
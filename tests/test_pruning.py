@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Scores of pruned models: with the pruned counts in the history totals,
+AddK and KneserNey still give a distribution over the next word, and
+StupidBackoff never scores above 1, in memory and once saved and loaded.
+max_bigrams bounds the exact bigram table while counting and in the model.
+"""
+
+import os
+import sys
+import math
+import random
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BigramModelSpellCheck import BigramModelSpellCheck
+from smoothing import AddK, KneserNey, StupidBackoff
+from pruning import Pruning
+from benchmark import write_corpus
+
+
+class BoundedPruning(Pruning):
+    """Records the size of the bigram table after every chunk."""
+
+    def __init__(self, *args, **kwargs):
+        Pruning.__init__(self, *args, **kwargs)
+        self.sizes = []
+
+    def check(self, vocab, store):
+        Pruning.check(self, vocab, store)
+        self.sizes.append(len(store.pending) + len(store.cols))
+
+
+class PrunedScoresTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='bigram_test')
+        cls.raw, cls.tokenised = write_corpus(cls.directory, seed=1, sentences=3000, vocab=800)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def models(self, smoothing, pruning):
+        bm = BigramModelSpellCheck(smoothing())
+        with open(self.tokenised, 'rb') as fp:
+            bm.build_model(fp, pruning)
+        self.assertTrue(bm.bigrams.sketch is not None)
+        filename = os.path.join(self.directory, 'pruned.bglm')
+        bm.save_model(filename)
+        loaded = BigramModelSpellCheck(smoothing())
+        loaded.load_model(filename)
+        return bm, loaded
+
+    def next_word_probabilities(self, bm, rows=10):
+        rng = random.Random(0)
+        V = len(bm.unigrams)
+        log_prob = bm.smoothing.log_prob
+        for _ in xrange(rows):
+            a = rng.randrange(V)
+            yield bm.unigrams.word(a), [math.exp(log_prob(a, b)) for b in xrange(V)]
+
+    def test_distributions(self):
+        for smoothing in (AddK, KneserNey):
+            for bm in self.models(smoothing, Pruning(min_count=3)):
+                for word, probabilities in self.next_word_probabilities(bm):
+                    self.assertAlmostEqual(sum(probabilities), 1.0, delta=0.05,
+                                           msg='%s: P(.|%r) sums to %f' % (smoothing.__name__, word, sum(probabilities)))
+
+    def test_stupid_backoff_at_most_one(self):
+        for min_count in (3, 1000):
+            for bm in self.models(StupidBackoff, Pruning(min_count=min_count)):
+                for word, probabilities in self.next_word_probabilities(bm):
+                    self.assertTrue(max(probabilities) <= 1.0, 'P(.|%r) up to %f' % (word, max(probabilities)))
+
+    def test_history_includes_pruned_counts(self):
+        exact = BigramModelSpellCheck()
+        with open(self.tokenised, 'rb') as fp:
+            exact.build_model(fp)
+        for bm in self.models(AddK, Pruning(min_count=3)):
+            for word in list(bm.unigrams)[:200]:
+                self.assertEqual(bm.bigrams.row_total(bm.unigrams.index(word)),
+                                 exact.bigrams.row_total(exact.unigrams.index(word)), word)
+
+    def test_max_bigrams_bound(self):
+        exact = BigramModelSpellCheck()
+        with open(self.tokenised, 'rb') as fp:
+            text = fp.read()
+        exact.build_model([text])
+        chunks = [text[i:i + 4096] for i in xrange(0, len(text), 4096)]
+        for max_bigrams in (len(exact.bigrams.cols) // 3, 500):
+            pruning = BoundedPruning(min_count=1, max_bigrams=max_bigrams)
+            bm = BigramModelSpellCheck()
+            bm.build_model(chunks, pruning)
+            self.assertTrue(max(pruning.sizes) <= max_bigrams, (max(pruning.sizes), max_bigrams))
+            self.assertTrue(0 < len(bm.bigrams.cols) <= max_bigrams, (len(bm.bigrams.cols), max_bigrams))
+            self.assertEqual(bm.bigrams.row_total(bm.unigrams.index('$$$')),
+                             exact.bigrams.row_total(exact.unigrams.index('$$$')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+The smoothing tables computed with numpy must equal those of the Python
+loops, for models in memory and loaded from a file, exact and pruned.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smoothing
+from smoothing import AddK, KneserNey, StupidBackoff
+from BigramModelSpellCheck import BigramModelSpellCheck
+from pruning import Pruning
+from benchmark import write_corpus
+
+
+def tables(smoothing_class, bm):
+    s = smoothing_class()
+    s.prepare(bm.unigrams, bm.bigrams)
+    return dict((name, list(value) if hasattr(value, 'typecode') else value)
+                for name, value in vars(s).items() if name != 'bigrams')
+
+
+@unittest.skipUnless(smoothing.NUMPY, 'numpy is not installed')
+class PrepareTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='bigram_test')
+        cls.raw, cls.tokenised = write_corpus(cls.directory, seed=4, sentences=2000, vocab=600)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def models(self):
+        for pruning in (None, Pruning(min_count=3)):
+            bm = BigramModelSpellCheck()
+            with open(self.tokenised, 'rb') as fp:
+                bm.build_model(fp, pruning)
+            bm.update_model([u'क\nख\n$$$\n'.encode('utf-8')])
+            bm.update_model([u'क\nख\n$$$\n'.encode('utf-8')], remove=True)      # words with a zero count
+            yield bm
+            filename = os.path.join(self.directory, 'model.bglm')
+            bm.save_model(filename)
+            loaded = BigramModelSpellCheck()
+            loaded.load_model(filename)
+            yield loaded
+
+    def test_same_as_python(self):
+        for bm in self.models():
+            for smoothing_class in (AddK, KneserNey, StupidBackoff):
+                vectorized = tables(smoothing_class, bm)
+                smoothing.NUMPY = False
+                try:
+                    expected = tables(smoothing_class, bm)
+                finally:
+                    smoothing.NUMPY = True
+                self.assertEqual(vectorized, expected, smoothing_class.__name__)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+The spell checking service: malformed requests are answered with 400,
+failures in the worker processes with 500, and /check suggests what
+find_max_edit_likelihood does for the same words.
+"""
+
+import os
+import sys
+import json
+import shutil
+import urllib2
+import tempfile
+import unittest
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BigramModelSpellCheck import BigramModelSpellCheck
+from spell_server import SpellCheckServer, SpellCheckHandler, SpellCheckClient
+
+TEXT = u'मैं\nघर\nजा\nरहा\nहूँ\n$$$\nवह\nपेड़\nके\nपास\nहै\n$$$\nघर\nमें\nपानी\nहै\n$$$\nमैं\nपानी\nपी\nरहा\nहूँ\n$$$\n'.encode('utf-8')
+
+
+def _broken(args):
+    raise RuntimeError('worker failed')
+
+
+class BrokenServer(SpellCheckServer):
+
+    def run(self, func, args):
+        return SpellCheckServer.run(self, _broken, args)
+
+
+class SpellServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='bigram_test')
+        cls.model_file = os.path.join(cls.directory, 'hin.bglm')
+        cls.model = BigramModelSpellCheck()
+        cls.model.build_model([TEXT])
+        cls.model.save_model(cls.model_file)
+        cls.log_message = SpellCheckHandler.log_message
+        SpellCheckHandler.log_message = lambda self, *args: None
+        cls.servers = []
+        cls.url = cls.serve(SpellCheckServer)
+        cls.broken_url = cls.serve(BrokenServer)
+
+    @classmethod
+    def serve(cls, server_class):
+        server = server_class(('localhost', 0), cls.model_file, processes=1)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        cls.servers.append(server)
+        return 'http://localhost:%d' % server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.shutdown()
+            server.server_close()
+        SpellCheckHandler.log_message = cls.log_message
+        shutil.rmtree(cls.directory)
+
+    def post(self, path, body, url=None):
+        try:
+            response = urllib2.urlopen((url or self.url) + path, body if isinstance(body, str) else json.dumps(body))
+            return response.getcode(), json.loads(response.read())
+        except urllib2.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_malformed_requests(self):
+        for path, body in (('/check', {'sentences': u'मैं घर'}),
+                           ('/check', {'sentences': [u'मैं घर', 3]}),
+                           ('/check', {'sentence': [u'मैं घर']}),
+                           ('/check', {'sentence': u'मैं घर', 'k': '5'}),
+                           ('/check', {'sentence': u'मैं घर', 'k': 2.5}),
+                           ('/check', {'sentence': u'मैं घर', 'threshold': 'low'}),
+                           ('/correct', {'sentence': u'मैं घर', 'beam': 0}),
+                           ('/score', {}),
+                           ('/score', [u'मैं घर']),
+                           ('/score', '{"sentence": '),
+                           ('/reload', {'model': 3})):
+            code, reply = self.post(path, body)
+            self.assertEqual(code, 400, '%s %r: %r' % (path, body, reply))
+            self.assertTrue(reply['error'])
+
+    def test_worker_failure(self):
+        code, reply = self.post('/score', {'sentence': u'मैं घर'}, self.broken_url)
+        self.assertEqual(code, 500)
+        self.assertTrue('worker failed' in reply['error'])
+
+    def test_check_suggestions(self):
+        sentence = u'मैं पनी पि रहा हूँ'
+        suspects = SpellCheckClient(self.url).check([sentence], threshold=0.0, k=3)[0]
+        self.assertTrue(suspects)
+        self.assertTrue(any(suspect['suggestions'] for suspect in suspects))
+        for suspect in suspects:
+            expected = self.model.find_max_edit_likelihood(sentence, suspect['index'] + 1, 3)
+            self.assertEqual([(word.decode('utf-8'), score) for word, score in expected],
+                             [tuple(suggestion) for suggestion in suspect['suggestions']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+The tokenizer's output, compared with a frozen copy. data/tokenizer_cases.jsonl
+holds, for each of the 15 languages, fuzzed lines (corpus text mixed with
+random letters, digits, dots, hyphens, quotes and sentence ends of several
+scripts) and sample corpus lines, with what the tokenizer returned for them
+before it was made to compile its patterns once per language. Any change in
+tokenization shows up here as a difference.
+"""
+
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indic_tokenizer
+
+CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'tokenizer_cases.jsonl')
+
+
+def load_cases():
+    with open(CASES, 'rb') as fp:
+        return [json.loads(line) for line in fp]
+
+
+class TokenizerOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.enchant = indic_tokenizer.ENCHANT
+        indic_tokenizer.ENCHANT = False     # the frozen output was made without an English dictionary
+
+    def tearDown(self):
+        indic_tokenizer.ENCHANT = self.enchant
+
+    def test_frozen_output(self):
+        tokenizers = {}
+        differences = []
+        cases = load_cases()
+        for case in cases:
+            lang = case['lang']
+            if lang not in tokenizers:
+                tokenizers[lang] = indic_tokenizer.tokenizer(lang)
+            t = tokenizers[lang]
+            tokens = t.tokenize(t.normalize(case['text']))
+            if tokens != case['tokens']:
+                differences.append((lang, case['text'], case['tokens'], tokens))
+        self.assertEqual(len(tokenizers), 15)
+        self.assertEqual(differences, [], '%d of %d lines tokenized differently, eg. %r'
+                         % (len(differences), len(cases), differences[:1]))
+
+    def test_tokenize_iter(self):
+        for case in load_cases():
+            t = indic_tokenizer.get_tokenizer(case['lang'])
+            text = t.normalize(case['text'])
+            self.assertEqual(list(t.tokenize_iter(text)), [token for token in case['tokens'].split('\n') if token])
+
+
+if __name__ == '__main__':
+    unittest.main()
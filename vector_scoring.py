@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized scoring with NumPy, used by BigramModelSpellCheck for large
+candidate sets and for batches of sentences when numpy is installed.
+
+The bigram table is viewed as one sorted array of packed keys a<<32|b
+(its CSR rows laid end to end), so the counts of any number of (a,b) pairs
+are gathered by a single searchsorted, and the smoothed log probabilities
+are computed from them with whole-array arithmetic. The count, row and
+smoothing arrays are wrapped without copying; only the keys are built.
+Results equal those of smoothing.*.log_prob.
+"""
+
+NUMPY = True
+
+try:
+    import numpy
+except ImportError:
+    NUMPY = False
+
+from ngram_store import ID_BITS
+from model_file import MappedArray
+from smoothing import AddK, KneserNey, StupidBackoff
+
+
+def as_numpy(values):
+    """Zero copy numpy view of an array.array or a MappedArray."""
+    if isinstance(values, MappedArray):
+        return numpy.frombuffer(values.buf, numpy.dtype(values.item.format), values.length, values.offset)
+    if not len(values):
+        return numpy.zeros(0, numpy.dtype(values.typecode))
+    return numpy.frombuffer(values, numpy.dtype(values.typecode))
+
+
+class VectorScorer:
+    """log P(b|a) for arrays of word ids under a model's smoothing, -1 standing for an unknown word."""
+
+    def __init__(self, bigrams, smoothing):
+        bigrams.freeze()
+        self.bigrams = bigrams
+        self.smoothing = smoothing
+        row_ptr = as_numpy(bigrams.row_ptr)
+        rows = numpy.repeat(numpy.arange(len(row_ptr) - 1, dtype=numpy.int64), numpy.diff(row_ptr))
+        self.keys = (rows << ID_BITS) | as_numpy(bigrams.cols).astype(numpy.int64)
+        self.vals = as_numpy(bigrams.vals)
+        self.score = SCORERS.get(smoothing.__class__, _python_log_probs)
+        self.tables = dict((name, as_numpy(getattr(smoothing, name))) for name in TABLES.get(smoothing.__class__, ()))
+
+    def counts(self, a, b):
+        """Bigram counts of the pairs (a[i],b[i]), with the store's sketch for pairs it pruned if the smoothing uses it."""
+        valid = (a >= 0) & (b >= 0)
+        n = numpy.zeros(len(a), numpy.int64)
+        if not len(self.keys):
+            found = numpy.zeros(len(a), bool)
+        else:
+            keys = (a.astype(numpy.int64) << ID_BITS) | b
+            at = numpy.minimum(numpy.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = valid & (self.keys[at] == keys)
+            n[found] = self.vals[at[found]]
+        if self.bigrams.sketch is not None and getattr(self.smoothing, 'sketched', True):
+            count = self.bigrams.count
+            for i in numpy.flatnonzero(valid & ~found):
+                n[i] = count(a[i], b[i])
+        return n
+
+    def log_probs(self, a, b):
+        a = numpy.asarray(a, numpy.int64)
+        b = numpy.asarray(b, numpy.int64)
+        return self.score(self, a, b, self.counts(a, b))
+
+
+def _add_k(scorer, a, b, n):
+    s = scorer.smoothing
+    out = numpy.empty(len(a))
+    known = a >= 0
+    out[~known] = s.log_k - s.log_unknown_denominator
+    out[known] = numpy.log(n[known] + s.k) - scorer.tables['log_denominators'][a[known]]     # log(0+k) == log_k
+    return out
+
+
+def _kneser_ney(scorer, a, b, n):
+    s = scorer.smoothing
+    tables = scorer.tables
+    p_lower = numpy.where(b >= 0, tables['p_continuation'][numpy.maximum(b, 0)], s.p_unknown)
+    known = a >= 0
+    out = numpy.log(p_lower)
+    ak = a[known]
+    out[known] = numpy.log(numpy.maximum(n[known] - s.d, 0.0) * tables['inverse_history'][ak]
+                           + tables['backoff'][ak] * p_lower[known])
+    return out
+
+
+def _stupid_backoff(scorer, a, b, n):
+    s = scorer.smoothing
+    tables = scorer.tables
+    out = numpy.empty(len(a))
+    seen = n > 0
+    unknown = ~seen & (b < 0)
+    backoff = ~seen & (b >= 0)
+    out[seen] = numpy.log(n[seen]) - tables['log_history'][a[seen]]
+    out[unknown] = s.log_backoff_unknown
+    out[backoff] = tables['log_backoff'][b[backoff]]
+    return out
+
+
+def _python_log_probs(scorer, a, b, n):     # smoothing without a vectorized form
+    log_prob = scorer.smoothing.log_prob
+    return numpy.array([log_prob(x, y) for x, y in zip(a.tolist(), b.tolist())])
+
+
+SCORERS = {AddK: _add_k, KneserNey: _kneser_ney, StupidBackoff: _stupid_backoff}
+TABLES = {AddK: ('log_denominators',),
+          KneserNey: ('p_continuation', 'inverse_history', 'backoff'),
+          StupidBackoff: ('log_history', 'log_backoff')}